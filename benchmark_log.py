@@ -0,0 +1,341 @@
+import json
+import os
+import sys
+import threading
+import time
+from collections import deque
+from typing import Callable, Dict, Iterable, Iterator, List, Optional
+
+# Append-only segment log for performance benchmark metrics
+#
+# Each segment is a JSONL file holding one record per line:
+#   {"category": ..., "metric_name": ..., "value": ..., "timestamp": ...}
+# Recording a metric appends a single line to the active segment, so the
+# cost of an append no longer depends on how much history has been stored.
+
+SEGMENT_PREFIX = "segment-"
+SEGMENT_SUFFIX = ".jsonl"
+DEFAULT_SEGMENT_MAX_BYTES = 4 * 1024 * 1024
+
+
+class SegmentLog:
+    def __init__(self, directory: str, segment_max_bytes: int = DEFAULT_SEGMENT_MAX_BYTES):
+        self.directory = directory
+        self.segment_max_bytes = segment_max_bytes
+        self._lock = threading.Lock()
+        os.makedirs(self.directory, exist_ok=True)
+
+    def segment_paths(self) -> List[str]:
+        """List segment files in write order"""
+        names = [
+            name for name in os.listdir(self.directory)
+            if name.startswith(SEGMENT_PREFIX) and name.endswith(SEGMENT_SUFFIX)
+        ]
+        return [os.path.join(self.directory, name) for name in sorted(names)]
+
+    def _segment_path(self, number: int) -> str:
+        return os.path.join(self.directory, f"{SEGMENT_PREFIX}{number:08d}{SEGMENT_SUFFIX}")
+
+    def segment_number(self, path: str) -> int:
+        name = os.path.basename(path)
+        return int(name[len(SEGMENT_PREFIX):-len(SEGMENT_SUFFIX)])
+
+    def active_segment(self) -> str:
+        """Return the segment new records go to, rotating when it is full"""
+        paths = self.segment_paths()
+        if not paths:
+            return self._segment_path(1)
+        current = paths[-1]
+        if os.path.getsize(current) >= self.segment_max_bytes:
+            return self._segment_path(self.segment_number(current) + 1)
+        return current
+
+    def is_empty(self) -> bool:
+        return not self.segment_paths()
+
+    def append(self, record: Dict) -> None:
+        """Append a single record to the active segment"""
+        self.append_many([record])
+
+    def append_many(self, records: Iterable[Dict]) -> None:
+        """Append records to the active segment in one write"""
+        payload = "".join(json.dumps(record, separators=(",", ":")) + "\n" for record in records)
+        if not payload:
+            return
+        with self._lock:
+            with open(self.active_segment(), "a", encoding="utf-8") as f:
+                f.write(payload)
+
+    def seal(self) -> int:
+        """Close the active segment to further appends.
+
+        Returns the number of the newest sealed segment (0 if none). A
+        non-empty active segment is sealed by starting an empty successor.
+        """
+        with self._lock:
+            paths = self.segment_paths()
+            if not paths:
+                return 0
+            current = paths[-1]
+            number = self.segment_number(current)
+            if os.path.getsize(current) == 0:
+                return number - 1
+            open(self._segment_path(number + 1), "a").close()
+            return number
+
+    def first_record(self, path: str) -> Optional[Dict]:
+        """The first readable record of a segment, if any"""
+        for record in self.read_segment(path):
+            return record
+        return None
+
+    def remove_segment(self, path: str) -> None:
+        with self._lock:
+            paths = self.segment_paths()
+            if paths and path == paths[-1]:
+                return
+            os.remove(path)
+
+    def read_records(self) -> Iterator[Dict]:
+        """Yield every stored record, recovering a torn tail in the last segment.
+
+        A crash in the middle of an append can leave a partial line at the end
+        of the newest segment. That tail is truncated back to the last complete
+        record so later appends start on a clean line. Unreadable lines in
+        older segments are skipped.
+        """
+        paths = self.segment_paths()
+        for index, path in enumerate(paths):
+            yield from self.read_segment(path, recover_tail=index == len(paths) - 1)
+
+    def read_segment(self, path: str, recover_tail: bool = False) -> Iterator[Dict]:
+        """Yield the records of one segment, skipping unreadable lines"""
+        offset = 0
+        torn_at = None
+        with open(path, "rb") as f:
+            for raw_line in f:
+                line_start = offset
+                offset += len(raw_line)
+                record = None
+                if raw_line.endswith(b"\n"):
+                    try:
+                        record = json.loads(raw_line)
+                    except ValueError:
+                        record = None
+                if not isinstance(record, dict):
+                    if torn_at is None:
+                        torn_at = line_start
+                    continue
+                torn_at = None
+                yield record
+        if recover_tail and torn_at is not None:
+            with self._lock:
+                with open(path, "r+b") as f:
+                    f.truncate(torn_at)
+
+    def load_metrics(self) -> Dict[str, List[Dict]]:
+        """Rebuild the category -> metrics mapping from the log"""
+        metrics: Dict[str, List[Dict]] = {}
+        for record in self.read_records():
+            category = record.pop("category", None)
+            if category is None:
+                continue
+            metrics.setdefault(category, []).append(record)
+        return metrics
+
+    def migrate_from_json(self, json_path: str) -> int:
+        """One-time import of the legacy whole-file JSON layout.
+
+        Only runs while the log is empty. The records are written to a
+        temporary file and renamed into place as the first segment, so an
+        interrupted migration is simply retried on the next start. Returns the
+        number of records migrated.
+        """
+        if not self.is_empty() or not os.path.exists(json_path):
+            return 0
+        try:
+            with open(json_path, "r") as f:
+                data = json.load(f)
+        except (OSError, ValueError):
+            return 0
+
+        first_segment = self._segment_path(1)
+        tmp_path = first_segment + ".tmp"
+        count = 0
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            for category, entries in data.items():
+                for entry in entries:
+                    record = {"category": category}
+                    record.update(entry)
+                    f.write(json.dumps(record, separators=(",", ":")) + "\n")
+                    count += 1
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, first_segment)
+        return count
+
+
+# Write-behind buffering
+#
+# Records are queued in memory and a background thread hands them to the
+# sink in batches, so callers never wait on disk I/O. The queue is bounded;
+# what happens when it is full is decided by the overflow policy:
+#   "drop_oldest" - evict the oldest queued record (default)
+#   "drop_newest" - discard the record being added
+#   "block"       - wait up to block_timeout seconds for room, then drop it
+
+OVERFLOW_POLICIES = ("drop_oldest", "drop_newest", "block")
+
+
+class WriteBehindBuffer:
+    def __init__(self, sink: Callable[[List[Dict]], None], capacity: int = 10000,
+                 batch_size: int = 256, max_age: float = 1.0,
+                 overflow: str = "drop_oldest", block_timeout: float = 0.05):
+        if overflow not in OVERFLOW_POLICIES:
+            raise ValueError(f"Unknown overflow policy: {overflow}")
+        self.sink = sink
+        self.capacity = capacity
+        self.batch_size = batch_size
+        self.max_age = max_age
+        self.overflow = overflow
+        self.block_timeout = block_timeout
+
+        self._queue: deque = deque()
+        self._oldest_at = None
+        self._closed = False
+        self._flushing = False
+        self._cond = threading.Condition()
+
+        self.enqueued = 0
+        self.flushed = 0
+        self.dropped = 0
+        self.batches = 0
+        self.flush_errors = 0
+
+        self._thread = threading.Thread(target=self._run, name="benchmark-flusher", daemon=True)
+        self._thread.start()
+
+    def put(self, record: Dict) -> bool:
+        """Queue a record for writing; returns False if it was dropped"""
+        with self._cond:
+            return self._put(record)
+
+    def put_many(self, records: Iterable[Dict]) -> int:
+        """Queue several records under one lock; returns how many were queued"""
+        with self._cond:
+            return sum(self._put(record) for record in records)
+
+    def _put(self, record: Dict) -> bool:
+        # Caller holds self._cond
+        if self._closed:
+            self.dropped += 1
+            return False
+        if len(self._queue) >= self.capacity:
+            if self.overflow == "drop_newest":
+                self.dropped += 1
+                return False
+            if self.overflow == "block":
+                deadline = time.monotonic() + self.block_timeout
+                while len(self._queue) >= self.capacity and not self._closed:
+                    remaining = deadline - time.monotonic()
+                    if remaining <= 0:
+                        break
+                    self._cond.notify_all()
+                    self._cond.wait(remaining)
+                if len(self._queue) >= self.capacity or self._closed:
+                    self.dropped += 1
+                    return False
+            else:
+                self._queue.popleft()
+                self.dropped += 1
+        if not self._queue:
+            self._oldest_at = time.monotonic()
+        self._queue.append(record)
+        self.enqueued += 1
+        if len(self._queue) >= self.batch_size:
+            self._cond.notify_all()
+        return True
+
+    def _take_batch(self) -> List[Dict]:
+        batch = [self._queue.popleft() for _ in range(min(self.batch_size, len(self._queue)))]
+        self._oldest_at = time.monotonic() if self._queue else None
+        self._flushing = True
+        self._cond.notify_all()
+        return batch
+
+    def _write_batch(self, batch: List[Dict]) -> None:
+        try:
+            self.sink(batch)
+            written = len(batch)
+            with self._cond:
+                self.flushed += written
+                self.batches += 1
+        except Exception:
+            with self._cond:
+                self.flush_errors += 1
+                self.dropped += len(batch)
+        finally:
+            with self._cond:
+                self._flushing = False
+                self._cond.notify_all()
+
+    def _run(self) -> None:
+        while True:
+            with self._cond:
+                while not self._closed:
+                    if len(self._queue) >= self.batch_size:
+                        break
+                    if self._queue and time.monotonic() - self._oldest_at >= self.max_age:
+                        break
+                    timeout = self.max_age
+                    if self._queue:
+                        timeout = max(0.0, self.max_age - (time.monotonic() - self._oldest_at))
+                    self._cond.wait(timeout)
+                if self._closed and not self._queue:
+                    return
+                while self._flushing:
+                    self._cond.wait()
+                if not self._queue:
+                    continue
+                batch = self._take_batch()
+            self._write_batch(batch)
+
+    def flush(self) -> None:
+        """Write everything queued so far before returning"""
+        while True:
+            with self._cond:
+                while self._flushing:
+                    self._cond.wait()
+                if not self._queue:
+                    return
+                batch = self._take_batch()
+            self._write_batch(batch)
+
+    def close(self) -> None:
+        """Stop the background thread after draining the queue"""
+        with self._cond:
+            if self._closed:
+                return
+            self._closed = True
+            self._cond.notify_all()
+        self._thread.join()
+        self.flush()
+
+    def stats(self) -> Dict[str, int]:
+        with self._cond:
+            return {
+                'queued': len(self._queue),
+                'enqueued': self.enqueued,
+                'flushed': self.flushed,
+                'dropped': self.dropped,
+                'batches': self.batches,
+                'flush_errors': self.flush_errors,
+            }
+
+
+if __name__ == "__main__":
+    # python benchmark_log.py [legacy_json] [log_directory]
+    legacy_file = sys.argv[1] if len(sys.argv) > 1 else "performance_benchmarks.json"
+    log_dir = sys.argv[2] if len(sys.argv) > 2 else "performance_benchmarks"
+    migrated = SegmentLog(log_dir).migrate_from_json(legacy_file)
+    print(f"Migrated {migrated} records from {legacy_file} into {log_dir}/")
@@ -0,0 +1,149 @@
+import threading
+import time
+from collections import OrderedDict
+from typing import Callable, Dict, Hashable, Optional
+
+import numpy as np
+
+# Chart pipeline for the performance dashboard
+#
+# Series are downsampled one metric at a time to a point budget about the
+# width of a chart in pixels, so the payload sent to the browser is bounded
+# no matter how long the window is:
+#   line, scatter  Largest-Triangle-Three-Buckets, which keeps the visual
+#                  shape (peaks, dips, slopes) of the series
+#   bar            the largest value of each bucket, so spikes survive
+# Charts with many points overall use WebGL (Scattergl) traces. Built
+# figures are kept in a small LRU keyed by chart (category, window, ...) and
+# tagged with the data version they were built from, so reruns and tab
+# switches reuse them until new metrics arrive.
+
+MAX_POINTS_PER_SERIES = 800
+WEBGL_THRESHOLD = 2000
+
+
+def lttb_indices(x: np.ndarray, y: np.ndarray, threshold: int) -> np.ndarray:
+    """Indices of the points Largest-Triangle-Three-Buckets keeps; x must be sorted"""
+    n = len(x)
+    if threshold >= n or threshold < 3:
+        return np.arange(n)
+    x = np.asarray(x, dtype=np.float64)
+    y = np.asarray(y, dtype=np.float64)
+    # First and last points are always kept; the rest is split into
+    # threshold - 2 buckets that each contribute one point
+    edges = np.linspace(1, n - 1, threshold - 1).astype(np.int64)
+    indices = np.empty(threshold, dtype=np.int64)
+    indices[0], indices[-1] = 0, n - 1
+    selected = 0
+    for bucket in range(threshold - 2):
+        lo, hi = edges[bucket], edges[bucket + 1]
+        if bucket + 2 < len(edges):
+            next_lo, next_hi = hi, edges[bucket + 2]
+            cx, cy = x[next_lo:next_hi].mean(), y[next_lo:next_hi].mean()
+        else:
+            cx, cy = x[-1], y[-1]
+        ax, ay = x[selected], y[selected]
+        areas = np.abs((ax - cx) * (y[lo:hi] - ay) - (ax - x[lo:hi]) * (cy - ay))
+        selected = lo + int(np.argmax(areas))
+        indices[bucket + 1] = selected
+    return indices
+
+
+def bucket_max_indices(y: np.ndarray, buckets: int) -> np.ndarray:
+    """Index of the largest value in each of `buckets` equal slices"""
+    n = len(y)
+    if buckets >= n or buckets < 1:
+        return np.arange(n)
+    edges = np.linspace(0, n, buckets + 1).astype(np.int64)
+    return np.array([lo + int(np.argmax(y[lo:hi])) for lo, hi in zip(edges[:-1], edges[1:])],
+                    dtype=np.int64)
+
+
+def downsample(kind: str, x: np.ndarray, y: np.ndarray, max_points: int) -> np.ndarray:
+    """Indices to keep of one sorted series for a chart of the given kind"""
+    if kind == "bar":
+        return bucket_max_indices(y, max_points)
+    if np.issubdtype(x.dtype, np.datetime64):
+        x = x.astype("datetime64[ns]").astype(np.int64)
+    return lttb_indices(x, y, max_points)
+
+
+def build_figure(df, kind: str, x: str, y: str, color: str, title: str,
+                 max_points: int = MAX_POINTS_PER_SERIES, webgl_threshold: int = WEBGL_THRESHOLD):
+    """A plotly figure with one downsampled trace per value of `color`.
+
+    kind is "line", "scatter" or "bar". The number of points before and
+    after downsampling is in `fig.layout.meta`.
+    """
+    import plotly.graph_objects as go
+
+    series = []
+    raw_points = 0
+    for name, group in df.groupby(color, sort=True):
+        group = group.sort_values(x, kind="stable")
+        xs = group[x].to_numpy()
+        ys = group[y].to_numpy(dtype=np.float64)
+        keep = ~np.isnan(ys)
+        xs, ys = xs[keep], ys[keep]
+        raw_points += len(ys)
+        indices = downsample(kind, xs, ys, max_points)
+        series.append((str(name), xs[indices], ys[indices]))
+
+    shown_points = sum(len(ys) for _, _, ys in series)
+    webgl = shown_points > webgl_threshold
+    traces = []
+    for name, xs, ys in series:
+        if kind == "bar":
+            traces.append(go.Bar(x=xs, y=ys, name=name))
+        else:
+            trace = go.Scattergl if webgl else go.Scatter
+            traces.append(trace(x=xs, y=ys, name=name, mode="lines" if kind == "line" else "markers"))
+    fig = go.Figure(traces)
+    fig.update_layout(title=title, legend_title_text=color, barmode="relative",
+                      xaxis_title=x, yaxis_title=y,
+                      meta={'raw_points': raw_points, 'points': shown_points, 'webgl': webgl})
+    return fig
+
+
+class FigureCache:
+    """LRU of built figures, each tagged with the data version it was built from.
+
+    A figure is reused while its version is current and it is younger than
+    `max_age` seconds (rolling windows move even without new data). Within
+    `min_interval` seconds of being built it is reused even if the version
+    moved, since pages record metrics of their own on every rerun.
+    """
+
+    def __init__(self, max_entries: int = 32, max_age: float = 60.0, min_interval: float = 5.0):
+        self.max_entries = max_entries
+        self.max_age = max_age
+        self.min_interval = min_interval
+        self._entries: "OrderedDict[Hashable, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get_or_build(self, key: Hashable, version: Hashable, build: Callable[[], Optional[object]]):
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                built_version, built_at, figure = entry
+                age = now - built_at
+                if age < self.min_interval or (built_version == version and age < self.max_age):
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return figure
+            self.misses += 1
+        # Built outside the lock; two sessions missing together both build
+        figure = build()
+        with self._lock:
+            self._entries[key] = (version, now, figure)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+        return figure
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {'hits': self.hits, 'misses': self.misses, 'figures': len(self._entries)}
@@ -1,15 +1,34 @@
 import streamlit as st
 import pandas as pd
-from datetime import datetime
-import os
+from datetime import datetime, timedelta
+
+import standup_archive
+from standup_search import StandupSearchIndex
+from standup_store import COLUMNS, StandupStore
 
 st.title("🧑‍💻 Developer Standup Entry")
 
 DATA_FILE = "developer_standup.csv"
-if os.path.exists(DATA_FILE):
-    df = pd.read_csv(DATA_FILE)
-else:
-    df = pd.DataFrame(columns=["Date", "Student ID", "Tasks Done", "What Learned"])
+PAGE_SIZE = 20
+
+store = StandupStore(DATA_FILE)
+
+
+@st.cache_resource
+def get_archive():
+    """Shared Parquet archive with its background compactor; None without pyarrow"""
+    if not standup_archive.available():
+        return None
+    archive = standup_archive.StandupArchive(StandupStore(DATA_FILE))
+    archive.start_compactor()
+    return archive
+
+
+@st.cache_resource
+def get_search_index():
+    """Shared full-text index; it picks up new standups on every search"""
+    return StandupSearchIndex(StandupStore(DATA_FILE))
+
 
 with st.form("standup_form"):
     student_id = st.text_input("🆔 Student ID")
@@ -24,9 +43,46 @@ with st.form("standup_form"):
             "Tasks Done": tasks_done,
             "What Learned": what_learned
         }
-        df = pd.concat([df, pd.DataFrame([new_entry])], ignore_index=True)
-        df.to_csv(DATA_FILE, index=False)
+        store.append(new_entry)
         st.success("✅ Standup submitted successfully!")
 
+# Entries are shown in submission order, newest first, rather than sorted
+# by the Date column: the newest are at the end of the file, so only the
+# requested page is read. Date-range browsing is in the history below.
 st.subheader("📊 Previous Standup Entries")
-st.dataframe(df.sort_values(by="Date", ascending=False))
+total_entries = store.count()
+page_count = store.page_count(PAGE_SIZE)
+page = 1
+if page_count > 1:
+    page = st.number_input(f"Page (1-{page_count}, newest first)", min_value=1,
+                           max_value=page_count, value=1, step=1)
+st.dataframe(pd.DataFrame(store.page(page - 1, PAGE_SIZE), columns=COLUMNS))
+st.caption(f"{total_entries} entries in total, newest submissions first")
+
+# Text searches go to the inverted index, plain history queries to the
+# month-partitioned archive
+st.subheader("🔎 Standup History")
+today = datetime.now().date()
+col1, col2 = st.columns(2)
+with col1:
+    date_range = st.date_input("📅 Date range", value=(today - timedelta(days=30), today))
+with col2:
+    student_filter = st.text_input("🆔 Filter by Student ID")
+search_text = st.text_input("🔍 Search tasks and learnings", placeholder='docker, "supabase auth"')
+
+if len(date_range) == 2:
+    start_date, end_date = date_range
+    end_date += timedelta(days=1)
+    student_ids = [student_filter] if student_filter else None
+    if search_text:
+        results = get_search_index().search(search_text, student_ids, start_date, end_date, limit=50)
+        st.dataframe(pd.DataFrame(results, columns=["score"] + COLUMNS))
+        st.caption(f"{len(results)} best matches")
+    else:
+        archive = get_archive()
+        if archive is None:
+            st.info("Install pyarrow to browse the standup history by date.")
+        else:
+            history = archive.query_frame(start_date, end_date, student_ids)
+            st.dataframe(history)
+            st.caption(f"{len(history)} matching entries")
@@ -0,0 +1,454 @@
+import argparse
+import csv
+import json
+import logging
+import multiprocessing
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from collections import Counter
+from typing import Callable, Dict, Iterator, List, Tuple
+
+# Multi-session load test for the Streamlit apps
+#
+#   python load_test.py --sessions 50
+#   python load_test.py --sessions 40 --processes 8 --storage sqlite --json
+#
+# Every simulated session is a headless streamlit AppTest. AppTest is not
+# safe to drive from several threads at once, so each worker process plays
+# a `streamlit run` server: its sessions share st.cache_resource singletons
+# and take turns, one rerun each, round-robin. --processes workers run in
+# parallel against the same data directory. Sessions cycle through four
+# scripted flows:
+#   home_intern  Home.py: log in, register as Developer Intern, view the dashboard
+#   home_lead    Home.py: log in, register as Tech Lead, view the performance dashboard
+#   techdev      techdev: log in, register as intern, add team members (one of
+#                them contended with other sessions), remove one
+#   standup      developer_intern.py: submit standups, browse the history
+# Logins go to the in-process stand-in for Supabase auth (auth_gateway), and
+# all data lives in a scratch directory.
+#
+# Every rerun is timed. Afterwards the data is checked against what the
+# sessions saw succeed: documents must parse, maintained stats must match a
+# full scan, acknowledged team members, roles, tech leads and standups must
+# all be stored exactly once, and a contended GitLab username may belong to
+# one team at most.
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+FLOWS = ("home_intern", "home_lead", "techdev", "standup")
+PASSWORD = "LoadTest123"
+TOKEN = "loadtest0token0for0tech0leads42"
+RUN_TIMEOUT = 120
+
+
+def _percentile(ordered: List[float], q: float) -> float:
+    return ordered[min(len(ordered) - 1, int(round(q * (len(ordered) - 1))))] if ordered else 0.0
+
+
+def summarize(samples: List[float]) -> Dict[str, float]:
+    ordered = sorted(samples)
+    return {
+        "count": len(ordered),
+        "p50_ms": round(_percentile(ordered, 0.50) * 1000, 1),
+        "p95_ms": round(_percentile(ordered, 0.95) * 1000, 1),
+        "p99_ms": round(_percentile(ordered, 0.99) * 1000, 1),
+        "max_ms": round((ordered[-1] if ordered else 0.0) * 1000, 1),
+    }
+
+
+class Recorder:
+    """Latency samples, errors and acknowledged writes of the sessions in one process"""
+
+    def __init__(self):
+        self.samples: List[Tuple[str, float]] = []
+        self.errors: List[str] = []
+        self.expected: Dict[str, List] = {"members": [], "contended": [], "roles": [],
+                                          "tech_leads": [], "standups": []}
+
+    def sample(self, step: str, seconds: float) -> None:
+        self.samples.append((step, seconds))
+
+    def error(self, message: str) -> None:
+        self.errors.append(message)
+
+    def expect(self, kind: str, *item) -> None:
+        self.expected[kind].append(item)
+
+    def to_dict(self) -> Dict:
+        return {"samples": self.samples, "errors": self.errors, "expected": self.expected}
+
+
+class Session:
+    """One simulated browser session of an app script"""
+
+    def __init__(self, script: str, flow: str, name: str, recorder: Recorder):
+        from streamlit.testing.v1 import AppTest
+
+        self.app = AppTest.from_file(os.path.join(APP_DIR, script), default_timeout=RUN_TIMEOUT)
+        self.flow = flow
+        self.name = name
+        self.recorder = recorder
+
+    def run(self, step: str, action: Callable = None) -> bool:
+        """Apply `action` to the page and rerun it; False if the rerun raised"""
+        started = time.perf_counter()
+        if action is not None:
+            action(self.app)
+        self.app.run()
+        self.recorder.sample(f"{self.flow}.{step}", time.perf_counter() - started)
+        if self.app.exception:
+            self.recorder.error(f"{self.name} {step}: {self.app.exception[0].value}")
+            return False
+        return True
+
+    def button(self, label: str):
+        for button in self.app.button:
+            if button.label == label:
+                return button
+        raise LookupError(f"{self.name}: no button {label!r} on the page")
+
+    def text(self) -> str:
+        return "\n".join(str(element.value) for element in self.app.markdown)
+
+    def messages(self, kind: str) -> List[str]:
+        return [str(element.value) for element in getattr(self.app, kind)]
+
+
+# Flows
+#
+# Generators that yield after every rerun; the scheduler sends the yielded
+# value back, so `ok = yield session.run(...)` reads naturally
+
+def _home_login(session: Session, email: str) -> Iterator[bool]:
+    yield session.run("open")
+    def login(app):
+        app.text_input[0].input(email)
+        app.text_input[1].input(PASSWORD)
+        session.button("Login").click()
+    yield session.run("login", login)
+    if not session.app.session_state["logged_in"]:
+        session.recorder.error(f"{session.name} login failed: {session.messages('error')}")
+        return False
+    return True
+
+
+def home_intern_flow(index: int, recorder: Recorder, options: Dict) -> Iterator[bool]:
+    email = f"intern{index}@loadtest.dev"
+    session = Session("Home.py", "home_intern", email, recorder)
+    if not (yield from _home_login(session, email)):
+        return
+    if (yield session.run("register_role", lambda app: session.button("👨‍💻 Register as Developer Intern").click())):
+        recorder.expect("roles", "users_roles.json", email, "Developer Intern")
+    for _ in range(options["views"]):
+        yield session.run("dashboard")
+
+
+def home_lead_flow(index: int, recorder: Recorder, options: Dict) -> Iterator[bool]:
+    email = f"lead{index}@loadtest.dev"
+    session = Session("Home.py", "home_lead", email, recorder)
+    if not (yield from _home_login(session, email)):
+        return
+    yield session.run("open_registration", lambda app: session.button("👨‍💼 Register as Tech Lead").click())
+    def register(app):
+        app.text_input[0].input(TOKEN)
+        app.text_input[1].input(TOKEN)
+        app.checkbox[0].check()
+        session.button("Register as Tech Lead").click()
+    if (yield session.run("register_tech_lead", register)) and session.app.session_state["tech_lead_verified"]:
+        recorder.expect("tech_leads", email)
+        recorder.expect("roles", "users_roles.json", email, "Tech Lead")
+    if not (yield session.run("open_benchmarks", lambda app: session.button("⚡ Performance Benchmarks").click())):
+        return
+    for _ in range(options["views"]):
+        yield session.run("performance_dashboard")
+
+
+def techdev_flow(index: int, recorder: Recorder, options: Dict) -> Iterator[bool]:
+    username = f"techdev{index}"
+    team_key = f"{username}_team"
+    session = Session("techdev", "techdev", username, recorder)
+    yield session.run("open")
+    def login(app):
+        app.text_input[0].input(username)
+        app.text_input[1].input(PASSWORD)
+        session.button("Login").click()
+    if not (yield session.run("login", login)) or not session.app.session_state["logged_in"]:
+        recorder.error(f"{username} login failed: {session.messages('error')}")
+        return
+    if (yield session.run("register_role", lambda app: session.button("👨‍💻 Register as Developer Intern").click())):
+        recorder.expect("roles", "users.json", username, "Developer Intern")
+    if not (yield session.run("open_team", lambda app: session.button("👥 Manage Team Members").click())):
+        return
+
+    members = [f"lt-{index}-{j}" for j in range(options["members"])]
+    contended = f"shared-{random.Random(index).randrange(options['contended_pool'])}"
+    for gitlab in members + [contended]:
+        def add(app, gitlab=gitlab):
+            app.text_input[0].input(f"Member {gitlab}")
+            app.text_input[1].input(gitlab)
+            session.button("Add Team Member").click()
+        if not (yield session.run("add_member", add)):
+            continue
+        if f"@{gitlab})" in session.text():
+            recorder.expect("members", team_key, gitlab, "added")
+            if gitlab == contended:
+                recorder.expect("contended", gitlab, team_key)
+        elif gitlab != contended:
+            recorder.error(f"{username} could not add {gitlab}: {session.messages('error')}")
+
+    # Remove the first member again
+    if members and (yield session.run("remove_member", lambda app: app.button(key="remove_1").click())):
+        if f"@{members[0]})" not in session.text():
+            recorder.expect("members", team_key, members[0], "removed")
+
+
+def standup_flow(index: int, recorder: Recorder, options: Dict) -> Iterator[bool]:
+    student_id = str(90000 + index)
+    session = Session("developer_intern.py", "standup", f"student {student_id}", recorder)
+    yield session.run("open")
+    for k in range(options["standups"]):
+        tag = f"loadtest-{index}-{k}"
+        def submit(app, tag=tag):
+            app.text_input[0].input(student_id)
+            app.text_area[0].input(f"{tag} reviewed merge requests")
+            app.text_area[1].input("load testing")
+            session.button("📤 Submit").click()
+        if (yield session.run("submit", submit)) and any("submitted" in m for m in session.messages("success")):
+            recorder.expect("standups", tag)
+    yield session.run("history", lambda app: app.text_input[1].input(student_id))
+
+
+FLOW_FUNCTIONS = {
+    "home_intern": home_intern_flow,
+    "home_lead": home_lead_flow,
+    "techdev": techdev_flow,
+    "standup": standup_flow,
+}
+
+
+# Running
+
+def assign_flows(sessions: int, flows: List[str]) -> List[Tuple[int, str]]:
+    return [(index, flows[index % len(flows)]) for index in range(sessions)]
+
+
+def run_sessions(assignments: List[Tuple[int, str]], options: Dict) -> Dict:
+    """Run sessions in this process, interleaving their steps round-robin"""
+    os.chdir(options["workdir"])
+    if APP_DIR not in sys.path:
+        sys.path.insert(0, APP_DIR)
+    from streamlit.testing.v1 import AppTest  # noqa: F401 (sets up streamlit's loggers)
+
+    # Deprecation notices and missing-context warnings would repeat per rerun
+    for name in list(logging.root.manager.loggerDict):
+        if name.startswith("streamlit"):
+            logging.getLogger(name).setLevel(logging.ERROR)
+    recorder = Recorder()
+    active = [(index, flow, FLOW_FUNCTIONS[flow](index, recorder, options)) for index, flow in assignments]
+    results = {index: None for index, _ in assignments}
+    while active:
+        still_active = []
+        for index, flow, steps in active:
+            try:
+                results[index] = steps.send(results[index])
+            except StopIteration:
+                continue
+            except Exception as e:
+                recorder.error(f"{flow} session {index}: {type(e).__name__}: {e}")
+                continue
+            still_active.append((index, flow, steps))
+        active = still_active
+    return recorder.to_dict()
+
+
+def prepare(workdir: str, assignments: List[Tuple[int, str]], auth) -> None:
+    """Seed the scratch directory and the stand-in auth backend"""
+    from storage import get_storage
+
+    storage = get_storage()
+    storage.save("users.json", {
+        f"techdev{index}": {"password": PASSWORD, "role": ""}
+        for index, flow in assignments if flow == "techdev"
+    })
+    for index, flow in assignments:
+        if flow == "home_intern":
+            auth.add_user(f"intern{index}@loadtest.dev", PASSWORD)
+        elif flow == "home_lead":
+            auth.add_user(f"lead{index}@loadtest.dev", PASSWORD)
+
+
+def check_integrity(workdir: str, expected: Dict[str, List]) -> Dict[str, List]:
+    """Problems found in the stored data, by check"""
+    from standup_store import StandupStore
+    from storage import TEAMS_DOC, TECH_LEADS_DOC, get_storage, verify_stats
+
+    problems = {"corrupt_json": [], "stats_drift": [], "lost_members": [], "unexpected_members": [],
+                "duplicate_members": [], "contended_winners": [], "roles": [], "tech_leads": [],
+                "lost_standups": [], "duplicate_standups": [], "standup_index": []}
+
+    for name in sorted(os.listdir(workdir)):
+        if name.endswith(".json"):
+            try:
+                with open(os.path.join(workdir, name), "r") as f:
+                    json.load(f)
+            except ValueError as e:
+                problems["corrupt_json"].append(f"{name}: {e}")
+
+    storage = get_storage()
+    problems["stats_drift"] = [f"{field}: stored {stored}, actual {actual}"
+                               for field, (stored, actual) in verify_stats(storage).items()]
+
+    teams = storage.load(TEAMS_DOC)
+    wanted: Dict[str, set] = {}
+    for team_key, gitlab, change in expected["members"]:
+        members = wanted.setdefault(team_key, set())
+        if change == "added":
+            members.add(gitlab)
+        else:
+            members.discard(gitlab)
+    for team_key, members in wanted.items():
+        stored = {member["gitlab_username"] for member in teams.get(team_key, {}).get("members", [])}
+        problems["lost_members"] += [f"{team_key}: {gitlab}" for gitlab in sorted(members - stored)]
+        problems["unexpected_members"] += [f"{team_key}: {gitlab}" for gitlab in sorted(stored - members)]
+    memberships = Counter(member["gitlab_username"].lower() for team in teams.values()
+                          for member in team.get("members", []))
+    problems["duplicate_members"] = [f"{gitlab} in {count} teams" for gitlab, count in memberships.items()
+                                     if count > 1]
+    winners = Counter(gitlab for gitlab, _ in expected["contended"])
+    problems["contended_winners"] = [f"{gitlab} acknowledged to {count} teams" for gitlab, count in winners.items()
+                                     if count > 1]
+
+    documents = {}
+    for doc, user, role in expected["roles"]:
+        if doc not in documents:
+            documents[doc] = storage.load(doc)
+        stored = documents[doc].get(user, {}).get("role")
+        if stored != role:
+            problems["roles"].append(f"{doc} {user}: {stored!r}, expected {role!r}")
+    tech_leads = storage.load(TECH_LEADS_DOC)
+    problems["tech_leads"] = [user for (user,) in expected["tech_leads"] if user not in tech_leads]
+
+    path = os.path.join(workdir, "developer_standup.csv")
+    store = StandupStore(path)
+    stored_tags = Counter(record["Tasks Done"].split(" ", 1)[0] for record in store.iter_range(0, store.count())
+                          if record.get("Tasks Done", "").startswith("loadtest-"))
+    for (tag,) in expected["standups"]:
+        if stored_tags[tag] == 0:
+            problems["lost_standups"].append(tag)
+        elif stored_tags[tag] > 1:
+            problems["duplicate_standups"].append(f"{tag} x{stored_tags[tag]}")
+    if os.path.exists(path):
+        with open(path, "r", newline="", encoding="utf-8") as f:
+            parsed = sum(1 for _ in csv.DictReader(f))
+        if parsed != store.count():
+            problems["standup_index"].append(f"index has {store.count()} records, the CSV parses to {parsed}")
+    return problems
+
+
+def run_load_test(sessions: int = 20, flows: List[str] = FLOWS, processes: int = 4, storage: str = "json",
+                  views: int = 3, members: int = 3, standups: int = 3, contended_pool: int = 4,
+                  auth_latency: float = 0.05, workdir: str = None) -> Dict:
+    from auth_gateway import FakeAuthServer
+
+    keep = workdir is not None
+    workdir = os.path.abspath(workdir or tempfile.mkdtemp(prefix="techdev-load-"))
+    os.makedirs(workdir, exist_ok=True)
+    previous_cwd = os.getcwd()
+    assignments = assign_flows(sessions, list(flows))
+    options = {"workdir": workdir, "views": views, "members": members, "standups": standups,
+               "contended_pool": contended_pool}
+    os.environ.update({
+        "TECHDEV_STORAGE": storage,
+        "TECHDEV_DATA_DIR": workdir,
+        "TECHDEV_DB": os.path.join(workdir, "techdev.db"),
+        "TECHDEV_SUPABASE_KEY": FakeAuthServer.API_KEY,
+    })
+    auth = FakeAuthServer(latency=auth_latency).start()
+    os.environ["TECHDEV_SUPABASE_URL"] = auth.url
+    try:
+        os.chdir(workdir)
+        prepare(workdir, assignments, auth)
+        started = time.perf_counter()
+        if processes <= 1:
+            outcomes = [run_sessions(assignments, options)]
+        else:
+            shares = [assignments[i::processes] for i in range(processes)]
+            with multiprocessing.get_context("spawn").Pool(processes) as pool:
+                outcomes = pool.starmap(run_sessions, [(share, options) for share in shares if share])
+        wall = time.perf_counter() - started
+        os.chdir(workdir)
+
+        samples, errors = [], []
+        expected = {kind: [] for kind in outcomes[0]["expected"]}
+        for outcome in outcomes:
+            samples += outcome["samples"]
+            errors += outcome["errors"]
+            for kind, items in outcome["expected"].items():
+                expected[kind] += [tuple(item) for item in items]
+        problems = check_integrity(workdir, expected)
+    finally:
+        auth.stop()
+        os.chdir(previous_cwd)
+        if not keep:
+            shutil.rmtree(workdir, ignore_errors=True)
+
+    by_step: Dict[str, List[float]] = {}
+    for step, seconds in samples:
+        by_step.setdefault(step, []).append(seconds)
+    return {
+        "meta": {"sessions": sessions, "flows": list(flows), "processes": processes, "storage": storage,
+                 "wall_seconds": round(wall, 2), "reruns": len(samples),
+                 "reruns_per_second": round(len(samples) / wall, 1) if wall else 0.0,
+                 "acknowledged": {kind: len(items) for kind, items in expected.items()}},
+        "latency": dict({"all": summarize([seconds for _, seconds in samples])},
+                        **{step: summarize(values) for step, values in sorted(by_step.items())}),
+        "errors": errors,
+        "integrity": problems,
+        "ok": not errors and not any(problems.values()),
+    }
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Concurrent headless sessions against the TechDev apps")
+    parser.add_argument("--sessions", type=int, default=20)
+    parser.add_argument("--flows", nargs="*", choices=FLOWS, default=list(FLOWS))
+    parser.add_argument("--processes", type=int, default=4, help="server processes sharing the data")
+    parser.add_argument("--storage", choices=("json", "sqlite"), default="json")
+    parser.add_argument("--views", type=int, default=3, help="dashboard views per Home session")
+    parser.add_argument("--members", type=int, default=3, help="team members each techdev session adds")
+    parser.add_argument("--standups", type=int, default=3, help="standups each standup session submits")
+    parser.add_argument("--contended-pool", type=int, default=4,
+                        help="GitLab usernames every techdev session competes for")
+    parser.add_argument("--auth-latency", type=float, default=0.05, help="simulated auth latency in seconds")
+    parser.add_argument("--workdir", help="keep the data here instead of a temp dir")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    args = parser.parse_args(argv)
+
+    report = run_load_test(args.sessions, args.flows, args.processes, args.storage, args.views, args.members,
+                           args.standups, args.contended_pool, args.auth_latency, args.workdir)
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return 0 if report["ok"] else 1
+
+    meta = report["meta"]
+    print(f"{meta['sessions']} sessions x {meta['processes']} process(es), {meta['storage']} storage: "
+          f"{meta['reruns']} reruns in {meta['wall_seconds']}s ({meta['reruns_per_second']}/s)")
+    print(f"\n{'step':36} {'count':>6} {'p50 ms':>9} {'p95 ms':>9} {'p99 ms':>9} {'max ms':>9}")
+    for step, stats in report["latency"].items():
+        print(f"{step:36} {stats['count']:>6} {stats['p50_ms']:>9.1f} {stats['p95_ms']:>9.1f} "
+              f"{stats['p99_ms']:>9.1f} {stats['max_ms']:>9.1f}")
+    print(f"\nacknowledged writes: {meta['acknowledged']}")
+    for check, found in report["integrity"].items():
+        print(f"{check:20} {'ok' if not found else f'{len(found)} problem(s): {found[:5]}'}")
+    if report["errors"]:
+        print(f"\n{len(report['errors'])} session error(s):")
+        for error in report["errors"][:20]:
+            print(f"  {error}")
+    return 0 if report["ok"] else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,448 @@
+import argparse
+import atexit
+import json
+import multiprocessing
+import os
+import shutil
+import socket
+import socketserver
+import tempfile
+import threading
+import time
+import uuid
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from benchmark_log import WriteBehindBuffer
+
+# Cross-process metric ingestion
+#
+# With several Streamlit server processes, one collector process owns the
+# PerformanceBenchmark (history, rollups, segment log) and every worker talks
+# to it over a Unix socket:
+#
+#   python metric_collector.py serve --socket /tmp/techdev-metrics.sock
+#   TECHDEV_METRICS_SOCKET=/tmp/techdev-metrics.sock streamlit run Home.py
+#
+# Workers get a RemoteBenchmark in place of PerformanceBenchmark. Recorded
+# metrics are queued and shipped in batches by the usual write-behind buffer;
+# queries (counts, quantiles, rollup frames, ...) are answered by the
+# collector. Each batch carries the worker id and a per-worker sequence
+# number and is resent until acknowledged, and the collector skips batches it
+# has already applied, so a dropped connection neither loses nor duplicates
+# metrics. Records are given up (and counted as dropped) only if the
+# collector stays unreachable through all of a batch's retries, or the queue
+# fills while it is down; recording never waits for the collector. The
+# protocol is one JSON object per line each way.
+
+DEFAULT_SOCKET = os.path.join(tempfile.gettempdir(), "techdev-metrics.sock")
+
+# Reconnects allowed when a page is waiting (queries and the publishes that
+# precede them) or the worker is exiting; the background sender uses `retries`
+QUERY_RETRIES = 1
+
+# PerformanceBenchmark methods workers may call remotely
+QUERY_METHODS = frozenset({
+    "get_benchmark_data", "get_benchmark_frame", "aggregate_metrics", "quantiles",
+    "get_rollup_frame", "data_version", "count_metrics", "metric_names", "buffer_stats",
+})
+
+
+class CollectorUnavailable(ConnectionError):
+    pass
+
+
+def _json_default(value):
+    # NumPy scalars from the metric store
+    if hasattr(value, "item"):
+        return value.item()
+    raise TypeError(f"{type(value).__name__} is not JSON serializable")
+
+
+def encode_result(result):
+    """JSON-safe form of a query result; DataFrames are sent column-wise"""
+    try:
+        import pandas as pd
+    except ImportError:
+        return result
+    if isinstance(result, pd.DataFrame):
+        dates = [column for column in result.columns if pd.api.types.is_datetime64_any_dtype(result[column])]
+        columns = {column: (result[column].astype("int64") if column in dates else result[column]).tolist()
+                   for column in result.columns}
+        return {"__frame__": {"columns": columns, "dates": dates, "attrs": dict(result.attrs)}}
+    return result
+
+
+def decode_result(result):
+    if isinstance(result, dict) and "__frame__" in result:
+        import pandas as pd
+        frame = result["__frame__"]
+        df = pd.DataFrame(frame["columns"])
+        for column in frame["dates"]:
+            df[column] = pd.to_datetime(df[column], unit="ns")
+        df.attrs.update(frame["attrs"])
+        return df
+    return result
+
+
+# Collector (aggregator) side
+
+class _CollectorHandler(socketserver.StreamRequestHandler):
+    def handle(self):
+        collector = self.server.collector
+        for line in self.rfile:
+            try:
+                reply = collector.handle(json.loads(line))
+            except Exception as e:
+                reply = {"ok": False, "error": f"{type(e).__name__}: {e}"}
+            self.wfile.write(json.dumps(reply, default=_json_default).encode() + b"\n")
+
+
+class _UnixServer(socketserver.ThreadingMixIn, socketserver.UnixStreamServer):
+    daemon_threads = True
+
+
+class MetricCollector:
+    """Serves one PerformanceBenchmark to worker processes over a Unix socket"""
+
+    def __init__(self, benchmark, socket_path: str = DEFAULT_SOCKET):
+        self.benchmark = benchmark
+        self.socket_path = socket_path
+        self._lock = threading.Lock()
+        self._worker_locks: Dict[str, threading.Lock] = {}
+        self._applied: Dict[str, int] = {}
+        self.events = 0
+        self.batches = 0
+        self.duplicates = 0
+        self.queries = 0
+        self._server: Optional[_UnixServer] = None
+        self._thread: Optional[threading.Thread] = None
+
+    def handle(self, message: Dict) -> Dict:
+        op = message.get("op")
+        if op == "publish":
+            return self.publish(message["worker"], message["batch"], message["events"])
+        if op == "query":
+            method = message.get("method")
+            if method not in QUERY_METHODS:
+                return {"ok": False, "error": f"Unknown query: {method}"}
+            result = getattr(self.benchmark, method)(*message.get("args", []), **message.get("kwargs", {}))
+            with self._lock:
+                self.queries += 1
+            return {"ok": True, "result": encode_result(result)}
+        if op == "stats":
+            return {"ok": True, "result": self.stats()}
+        return {"ok": False, "error": f"Unknown op: {op}"}
+
+    def publish(self, worker: str, batch: int, events: List[Dict]) -> Dict:
+        """Apply a worker's batch once; resends of applied batches are acknowledged and skipped"""
+        with self._lock:
+            worker_lock = self._worker_locks.setdefault(worker, threading.Lock())
+        with worker_lock:
+            if batch <= self._applied.get(worker, 0):
+                with self._lock:
+                    self.duplicates += 1
+                return {"ok": True, "duplicate": True}
+            self.benchmark.record_metrics(events)
+            self._applied[worker] = batch
+        with self._lock:
+            self.events += len(events)
+            self.batches += 1
+        return {"ok": True}
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {"workers": len(self._applied), "events": self.events, "batches": self.batches,
+                    "duplicates": self.duplicates, "queries": self.queries}
+
+    def start(self) -> "MetricCollector":
+        if os.path.exists(self.socket_path):
+            # A socket file left by a collector that did not shut down cleanly
+            probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+            try:
+                probe.connect(self.socket_path)
+                raise RuntimeError(f"A collector is already listening on {self.socket_path}")
+            except (ConnectionRefusedError, FileNotFoundError):
+                os.unlink(self.socket_path)
+            finally:
+                probe.close()
+        self._server = _UnixServer(self.socket_path, _CollectorHandler)
+        self._server.collector = self
+        self._thread = threading.Thread(target=self._server.serve_forever, name="metric-collector", daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self) -> None:
+        """Stop serving and flush the benchmark"""
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
+            try:
+                os.unlink(self.socket_path)
+            except FileNotFoundError:
+                pass
+        self.benchmark.close()
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+        return False
+
+
+# Worker side
+
+class RemoteBenchmark:
+    """Stand-in for PerformanceBenchmark in a worker process.
+
+    Metrics are queued and published by a background thread; a batch that
+    cannot be delivered after `retries` reconnects, and the oldest records of
+    a full queue, are counted as dropped in buffer_stats(). Queries flush the queue first, so a worker sees its own
+    metrics. They run on the page's thread, so they fail fast with
+    CollectorUnavailable when the collector cannot be reached, leaving the
+    queue to the background thread. The queue is flushed at exit.
+    """
+
+    def __init__(self, socket_path: str = DEFAULT_SOCKET, timeout: float = 5.0, retries: int = 8,
+                 backoff: float = 0.05):
+        self.socket_path = socket_path
+        self.timeout = timeout
+        self.retries = retries
+        self.backoff = backoff
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}:{uuid.uuid4().hex[:8]}"
+        self._batches = 0
+        self._lock = threading.Lock()
+        self._sock: Optional[socket.socket] = None
+        self._reader = None
+        self._local = threading.local()
+        self._closing = False
+        # record_metric runs on the page's thread: a full queue drops its
+        # oldest records rather than wait for a collector that is down
+        self.write_buffer = WriteBehindBuffer(self._publish, overflow="drop_oldest")
+        atexit.register(self.close)
+
+    def _connect(self) -> None:
+        sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        sock.settimeout(self.timeout)
+        try:
+            sock.connect(self.socket_path)
+        except OSError:
+            sock.close()
+            raise
+        self._sock = sock
+        self._reader = sock.makefile("rb")
+
+    def _disconnect(self) -> None:
+        if self._sock is not None:
+            try:
+                self._reader.close()
+                self._sock.close()
+            except OSError:
+                pass
+        self._sock = None
+        self._reader = None
+
+    def _request(self, message: Dict, retries: int = None) -> Dict:
+        """Send one message and wait for the reply, reconnecting on socket errors"""
+        payload = json.dumps(message, default=_json_default).encode() + b"\n"
+        retries = self.retries if retries is None else retries
+        error = None
+        for attempt in range(retries + 1):
+            if attempt and self._closing and attempt > QUERY_RETRIES:
+                # A batch already retrying when close() was called
+                break
+            if attempt:
+                time.sleep(min(self.backoff * 2 ** (attempt - 1), 1.0))
+            with self._lock:
+                try:
+                    if self._sock is None:
+                        self._connect()
+                    self._sock.sendall(payload)
+                    line = self._reader.readline()
+                    if not line:
+                        raise ConnectionError("collector closed the connection")
+                    reply = json.loads(line)
+                except (OSError, ValueError) as e:
+                    self._disconnect()
+                    error = e
+                    continue
+            if not reply.get("ok"):
+                raise RuntimeError(reply.get("error", "collector error"))
+            return reply
+        raise CollectorUnavailable(f"Metrics collector at {self.socket_path} is unavailable: {error}")
+
+    def _publish(self, records: List[Dict]) -> None:
+        # Called by the write-behind thread one batch at a time, so batch
+        # numbers reach the collector in order; a retried batch keeps its number
+        self._batches += 1
+        if self._closing and not self._reachable():
+            raise CollectorUnavailable(f"Metrics collector at {self.socket_path} is unavailable")
+        retries = QUERY_RETRIES if self._closing or getattr(self._local, "querying", False) else None
+        self._request({"op": "publish", "worker": self.worker_id, "batch": self._batches, "events": records},
+                      retries=retries)
+
+    def _reachable(self) -> bool:
+        """Whether the collector accepts a connection right now (one attempt, no backoff)"""
+        with self._lock:
+            if self._sock is not None:
+                return True
+            try:
+                self._connect()
+            except OSError:
+                return False
+            return True
+
+    def _query(self, method: str, *args, **kwargs):
+        if not self._reachable():
+            raise CollectorUnavailable(f"Metrics collector at {self.socket_path} is unavailable")
+        self._local.querying = True
+        try:
+            self.flush()
+        finally:
+            self._local.querying = False
+        reply = self._request({"op": "query", "method": method, "args": args, "kwargs": kwargs},
+                              retries=QUERY_RETRIES)
+        return decode_result(reply["result"])
+
+    def record_metric(self, category: str, metric_name: str, value: float, timestamp: str = None):
+        """Queue a metric for the collector"""
+        if timestamp is None:
+            timestamp = datetime.now().isoformat()
+        self.write_buffer.put({
+            'category': category,
+            'metric_name': metric_name,
+            'value': value,
+            'timestamp': timestamp
+        })
+
+    def flush(self):
+        """Publish all queued metrics now"""
+        self.write_buffer.flush()
+
+    def close(self):
+        # Publish what is queued, without waiting out a long backoff at exit
+        self._closing = True
+        self.write_buffer.close()
+        with self._lock:
+            self._disconnect()
+
+    def buffer_stats(self) -> Dict[str, int]:
+        """Counters of this worker's queue"""
+        return self.write_buffer.stats()
+
+    def collector_stats(self) -> Dict[str, int]:
+        return self._request({"op": "stats"}, retries=QUERY_RETRIES)["result"]
+
+    def get_benchmark_data(self, category: str, days: int = 30, metric_name=None,
+                           since: float = None, until: float = None) -> List[Dict]:
+        return self._query("get_benchmark_data", category, days, metric_name, since, until)
+
+    def get_benchmark_frame(self, category: str, days: int = 30, metric_name=None,
+                            since: float = None, until: float = None):
+        return self._query("get_benchmark_frame", category, days, metric_name, since, until)
+
+    def aggregate_metrics(self, category: str, days: int = None, metric_name=None) -> Dict[str, Dict[str, float]]:
+        return self._query("aggregate_metrics", category, days, metric_name)
+
+    def quantiles(self, category: str, quantiles=(0.50, 0.95, 0.99), days: float = None,
+                  metric_name=None) -> Dict[float, float]:
+        result = self._query("quantiles", category, list(quantiles), days, metric_name)
+        return {float(q): value for q, value in result.items()}
+
+    def get_rollup_frame(self, category: str, days: int = 7, metric_name=None, max_points: int = 500):
+        return self._query("get_rollup_frame", category, days, metric_name, max_points)
+
+    def data_version(self, category: str) -> int:
+        return self._query("data_version", category)
+
+    def count_metrics(self, category: str, days: int = None, metric_name=None) -> int:
+        return self._query("count_metrics", category, days, metric_name)
+
+    def metric_names(self, category: str, prefix: str = "") -> List[str]:
+        return self._query("metric_names", category, prefix)
+
+
+# Benchmark: N worker processes publishing to one collector
+
+def _worker(socket_path: str, worker: int, events: int, start_at: float) -> Dict:
+    remote = RemoteBenchmark(socket_path)
+    while time.time() < start_at:
+        time.sleep(0.001)
+    started = time.perf_counter()
+    for i in range(events):
+        remote.record_metric("system_performance", f"bench_worker_{worker}", i % 100 / 1000)
+    remote.flush()
+    elapsed = time.perf_counter() - started
+    stats = remote.buffer_stats()
+    remote.close()
+    return {"elapsed": elapsed, "dropped": stats["dropped"]}
+
+
+def benchmark(worker_counts=(1, 2, 4), events: int = 20000) -> List[Dict]:
+    """Events per second through a collector for each worker count, and whether all arrived once"""
+    import Home
+
+    rows = []
+    cwd = os.getcwd()
+    ctx = multiprocessing.get_context("spawn")
+    for workers in worker_counts:
+        workdir = tempfile.mkdtemp(prefix="techdev-collector-")
+        os.chdir(workdir)
+        try:
+            socket_path = os.path.join(workdir, "metrics.sock")
+            with MetricCollector(Home.PerformanceBenchmark(write_overflow="block"), socket_path) as collector:
+                with ctx.Pool(workers) as pool:
+                    # Workers start together once every process is up
+                    start_at = time.time() + 1.0
+                    results = pool.starmap(_worker, [(socket_path, w, events, start_at) for w in range(workers)])
+                stats = collector.stats()
+                recorded = collector.benchmark.count_metrics("system_performance")
+            persisted = sum(1 for path in collector.benchmark.segment_log.segment_paths()
+                            for _ in collector.benchmark.segment_log.read_segment(path))
+            slowest = max(result["elapsed"] for result in results)
+            rows.append({
+                "workers": workers,
+                "events": workers * events,
+                "events_per_s": round(workers * events / slowest),
+                "recorded": recorded,
+                "persisted": persisted,
+                "dropped": sum(result["dropped"] for result in results),
+                "duplicates_skipped": stats["duplicates"],
+                "exact": recorded == persisted == workers * events,
+                "cpus": os.cpu_count(),
+            })
+        finally:
+            os.chdir(cwd)
+            shutil.rmtree(workdir, ignore_errors=True)
+    return rows
+
+
+def main(argv: List[str] = None) -> None:
+    parser = argparse.ArgumentParser(description="Metric collector for multi-process deployments")
+    commands = parser.add_subparsers(dest="command", required=True)
+    serve = commands.add_parser("serve", help="run the collector (point TECHDEV_METRICS_SOCKET at it)")
+    serve.add_argument("--socket", default=os.environ.get("TECHDEV_METRICS_SOCKET", DEFAULT_SOCKET))
+    bench = commands.add_parser("bench", help="measure ingestion throughput with N worker processes")
+    bench.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    bench.add_argument("--events", type=int, default=20000, help="metrics recorded by each worker")
+    args = parser.parse_args(argv)
+
+    if args.command == "serve":
+        # Run from the app directory: the benchmark's files are relative to it
+        import Home
+        collector = MetricCollector(Home.PerformanceBenchmark(write_overflow="block"), args.socket).start()
+        print(f"Metric collector listening on {args.socket}")
+        try:
+            while True:
+                time.sleep(3600)
+        except KeyboardInterrupt:
+            collector.stop()
+    elif args.command == "bench":
+        for row in benchmark(args.workers, args.events):
+            print(json.dumps(row))
+
+
+if __name__ == "__main__":
+    main()
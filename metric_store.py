@@ -0,0 +1,308 @@
+import threading
+import warnings
+from datetime import datetime, timedelta
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+import numpy as np
+
+# Columnar, time-indexed metric storage
+#
+# Each category keeps three growable NumPy columns sorted by time:
+#   times    float64  seconds since the epoch (naive local wall clock)
+#   values   float64  metric value
+#   name_ids int32    interned metric name
+# Range queries use binary search on `times` and name filters are vectorized
+# masks over the matching slice, so a window costs O(log n + k). A million
+# points takes about 20 MB.
+
+MetricNames = Union[str, Iterable[str], None]
+
+EPOCH = datetime(1970, 1, 1)
+INITIAL_CAPACITY = 1024
+
+
+def parse_timestamp(timestamp: str) -> float:
+    """Convert an ISO timestamp to epoch seconds of its local wall-clock time"""
+    dt = datetime.fromisoformat(timestamp)
+    if dt.tzinfo is not None:
+        dt = dt.astimezone().replace(tzinfo=None)
+    return (dt - EPOCH).total_seconds()
+
+
+def parse_timestamps(timestamps: List[str]) -> np.ndarray:
+    """Vectorized parse_timestamp for naive ISO timestamps"""
+    try:
+        # numpy only warns about UTC offsets; those need the slow path
+        with warnings.catch_warnings():
+            warnings.simplefilter('error')
+            parsed = np.array(timestamps, dtype='datetime64[us]')
+        return parsed.astype(np.int64) / 1e6
+    except (ValueError, Warning):
+        return np.array([parse_timestamp(ts) for ts in timestamps], dtype=np.float64)
+
+
+def to_datetime64(times: np.ndarray) -> np.ndarray:
+    """Epoch seconds to datetime64[us] without going through Python objects"""
+    return np.round(times * 1e6).astype(np.int64).view('datetime64[us]')
+
+
+def format_timestamp(ts: float) -> str:
+    """Inverse of parse_timestamp"""
+    return (EPOCH + timedelta(seconds=float(ts))).isoformat()
+
+
+def now_timestamp() -> float:
+    return (datetime.now() - EPOCH).total_seconds()
+
+
+class CategoryColumns:
+    def __init__(self, capacity: int = INITIAL_CAPACITY):
+        self.size = 0
+        self._times = np.empty(capacity, dtype=np.float64)
+        self._values = np.empty(capacity, dtype=np.float64)
+        self._name_ids = np.empty(capacity, dtype=np.int32)
+
+    @property
+    def times(self) -> np.ndarray:
+        return self._times[:self.size]
+
+    @property
+    def values(self) -> np.ndarray:
+        return self._values[:self.size]
+
+    @property
+    def name_ids(self) -> np.ndarray:
+        return self._name_ids[:self.size]
+
+    def _reserve(self, extra: int, fresh: bool = False) -> None:
+        """Make room for `extra` rows; `fresh` copies into new buffers even if they fit"""
+        needed = self.size + extra
+        if needed <= len(self._times):
+            if not fresh:
+                return
+            capacity = len(self._times)
+        else:
+            capacity = max(needed, 2 * len(self._times))
+        for attr in ('_times', '_values', '_name_ids'):
+            old = getattr(self, attr)
+            grown = np.empty(capacity, dtype=old.dtype)
+            grown[:self.size] = old[:self.size]
+            setattr(self, attr, grown)
+
+    def append(self, ts: float, name_id: int, value: float) -> None:
+        position = self.size
+        # Metrics almost always arrive in time order; late arrivals are
+        # inserted at their sorted position. That shifts existing rows, so it
+        # happens in fresh buffers and views handed out earlier stay valid
+        late = bool(position) and ts < self._times[position - 1]
+        self._reserve(1, fresh=late)
+        if late:
+            position = int(np.searchsorted(self._times[:self.size], ts, side='right'))
+            for column in (self._times, self._values, self._name_ids):
+                column[position + 1:self.size + 1] = column[position:self.size]
+        self._times[position] = ts
+        self._values[position] = value
+        self._name_ids[position] = name_id
+        self.size += 1
+
+    def extend(self, times: np.ndarray, name_ids: np.ndarray, values: np.ndarray) -> None:
+        """Bulk append, re-sorting once if the batch is out of order"""
+        if not len(times):
+            return
+        # Re-sorting rows already stored moves them, so do it in fresh buffers
+        moves_existing = self.size > 0 and times.min() < self._times[self.size - 1]
+        self._reserve(len(times), fresh=moves_existing)
+        end = self.size + len(times)
+        self._times[self.size:end] = times
+        self._values[self.size:end] = values
+        self._name_ids[self.size:end] = name_ids
+        was_sorted = self.size == 0 or times[0] >= self._times[self.size - 1]
+        previous_size, self.size = self.size, end
+        if not was_sorted or np.any(np.diff(times) < 0):
+            # Only the tail from the batch's earliest point onwards can be out of order
+            start = int(np.searchsorted(self._times[:previous_size], times.min(), side='right'))
+            order = np.argsort(self._times[start:end], kind='stable')
+            for column in (self._times, self._values, self._name_ids):
+                column[start:end] = column[start:end][order]
+
+    def window(self, start: Optional[float], end: Optional[float]) -> Tuple[int, int]:
+        times = self.times
+        lo = 0 if start is None else int(np.searchsorted(times, start, side='left'))
+        hi = self.size if end is None else int(np.searchsorted(times, end, side='right'))
+        return lo, hi
+
+    def drop_before(self, cutoff: float) -> int:
+        """Discard points older than cutoff; returns how many were dropped"""
+        drop = int(np.searchsorted(self.times, cutoff, side='left'))
+        if drop:
+            # Copy into fresh buffers so views handed out earlier stay valid
+            keep = self.size - drop
+            for attr in ('_times', '_values', '_name_ids'):
+                old = getattr(self, attr)
+                trimmed = np.empty(max(INITIAL_CAPACITY, 2 * keep), dtype=old.dtype)
+                trimmed[:keep] = old[drop:self.size]
+                setattr(self, attr, trimmed)
+            self.size = keep
+        return drop
+
+    def nbytes(self) -> int:
+        return self._times.nbytes + self._values.nbytes + self._name_ids.nbytes
+
+
+class MetricStore:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._categories: Dict[str, CategoryColumns] = {}
+        self.names: List[str] = []
+        self._name_ids: Dict[str, int] = {}
+
+    def intern(self, metric_name: str) -> int:
+        name_id = self._name_ids.get(metric_name)
+        if name_id is None:
+            name_id = len(self.names)
+            self.names.append(metric_name)
+            self._name_ids[metric_name] = name_id
+        return name_id
+
+    def categories(self) -> List[str]:
+        with self._lock:
+            return list(self._categories)
+
+    def add(self, category: str, metric_name: str, value: float, ts: float) -> None:
+        with self._lock:
+            columns = self._categories.setdefault(category, CategoryColumns())
+            columns.append(ts, self.intern(metric_name), value)
+
+    def add_records(self, records: Iterable[Dict]) -> int:
+        """Bulk-load {'category', 'metric_name', 'value', 'timestamp'} records"""
+        batches: Dict[str, Tuple[List[str], List[int], List[float]]] = {}
+        count = 0
+        with self._lock:
+            for record in records:
+                try:
+                    timestamp = record['timestamp']
+                    value = float(record['value'])
+                except (KeyError, TypeError, ValueError):
+                    continue
+                stamps, name_ids, values = batches.setdefault(record.get('category', ''), ([], [], []))
+                stamps.append(timestamp)
+                name_ids.append(self.intern(record.get('metric_name', '')))
+                values.append(value)
+                count += 1
+            # Parse every category before extending any, so a bad timestamp
+            # (ValueError) leaves the store unchanged
+            parsed = {category: parse_timestamps(stamps) for category, (stamps, _, _) in batches.items()}
+            for category, (stamps, name_ids, values) in batches.items():
+                columns = self._categories.setdefault(category, CategoryColumns(max(INITIAL_CAPACITY, len(stamps))))
+                columns.extend(parsed[category],
+                               np.asarray(name_ids, dtype=np.int32),
+                               np.asarray(values, dtype=np.float64))
+        return count
+
+    def ensure_category(self, category: str) -> None:
+        with self._lock:
+            self._categories.setdefault(category, CategoryColumns())
+
+    def _name_filter(self, metric_name: MetricNames) -> Optional[np.ndarray]:
+        if metric_name is None:
+            return None
+        names = [metric_name] if isinstance(metric_name, str) else list(metric_name)
+        return np.array([self._name_ids[name] for name in names if name in self._name_ids], dtype=np.int32)
+
+    def columns(self, category: str, start: Optional[float] = None, end: Optional[float] = None,
+                metric_name: MetricNames = None) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """(times, name_ids, values) arrays for a window.
+
+        Without a name filter these are views into the store, not copies;
+        treat them as read-only. Later writes never move rows under a view:
+        anything that would reorders fresh buffers instead.
+        """
+        with self._lock:
+            columns = self._categories.get(category)
+            if columns is None:
+                empty = np.empty(0)
+                return empty, np.empty(0, dtype=np.int32), empty
+            lo, hi = columns.window(start, end)
+            times = columns.times[lo:hi]
+            name_ids = columns.name_ids[lo:hi]
+            values = columns.values[lo:hi]
+            wanted = self._name_filter(metric_name)
+        if wanted is not None:
+            mask = np.isin(name_ids, wanted)
+            times, name_ids, values = times[mask], name_ids[mask], values[mask]
+        return times, name_ids, values
+
+    def query(self, category: str, start: Optional[float] = None, end: Optional[float] = None,
+              metric_name: MetricNames = None) -> List[Dict]:
+        """Metrics in a window as a list of dicts, in timestamp order"""
+        times, name_ids, values = self.columns(category, start, end, metric_name)
+        names = self.names
+        return [
+            {'metric_name': names[name_id], 'value': value, 'timestamp': format_timestamp(ts)}
+            for ts, name_id, value in zip(times.tolist(), name_ids.tolist(), values.tolist())
+        ]
+
+    def count(self, category: str, start: Optional[float] = None, end: Optional[float] = None,
+              metric_name: MetricNames = None) -> int:
+        if metric_name is None:
+            with self._lock:
+                columns = self._categories.get(category)
+                if columns is None:
+                    return 0
+                lo, hi = columns.window(start, end)
+                return hi - lo
+        return len(self.columns(category, start, end, metric_name)[0])
+
+    def aggregate(self, category: str, start: Optional[float] = None, end: Optional[float] = None,
+                  metric_name: MetricNames = None) -> Dict[str, Dict[str, float]]:
+        """Per-metric count, sum and mean over a window"""
+        _, name_ids, values = self.columns(category, start, end, metric_name)
+        if not len(name_ids):
+            return {}
+        counts = np.bincount(name_ids)
+        sums = np.bincount(name_ids, weights=values)
+        return {
+            self.names[name_id]: {
+                'count': int(counts[name_id]),
+                'sum': float(sums[name_id]),
+                'mean': float(sums[name_id] / counts[name_id]),
+            }
+            for name_id in np.flatnonzero(counts)
+        }
+
+    def metric_names(self, category: str) -> List[str]:
+        with self._lock:
+            columns = self._categories.get(category)
+            if columns is None:
+                return []
+            name_ids = np.unique(columns.name_ids)
+        return sorted(self.names[name_id] for name_id in name_ids)
+
+    def frame(self, category: str, start: Optional[float] = None, end: Optional[float] = None,
+              metric_name: MetricNames = None):
+        """DataFrame with timestamp, metric_name and value columns.
+
+        metric_name is a Categorical built directly on the interned ids and
+        value wraps the stored column without copying.
+        """
+        import pandas as pd
+
+        times, name_ids, values = self.columns(category, start, end, metric_name)
+        return pd.DataFrame({
+            'timestamp': to_datetime64(times),
+            'metric_name': pd.Categorical.from_codes(name_ids, categories=list(self.names)).remove_unused_categories(),
+            'value': values,
+        }, copy=False)
+
+    def drop_before(self, cutoff: float) -> int:
+        """Apply raw retention across all categories"""
+        with self._lock:
+            return sum(columns.drop_before(cutoff) for columns in self._categories.values())
+
+    def to_dict(self) -> Dict[str, List[Dict]]:
+        """Materialize the legacy {category: [metric, ...]} layout"""
+        return {category: self.query(category) for category in self.categories()}
+
+    def nbytes(self) -> int:
+        with self._lock:
+            return sum(columns.nbytes() for columns in self._categories.values())
@@ -0,0 +1,162 @@
+import math
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Callable, Dict, List, Optional, Sequence, Tuple
+
+from instrumentation import Histogram, bucket_bounds
+
+# OpenMetrics exporter
+#
+# A stdlib HTTP server on a daemon thread serves GET /metrics in the
+# OpenMetrics text format. The app passes a `collect` callable that returns
+# MetricFamily objects built from in-memory state (rollups, span histograms,
+# cache counters), and the rendered page is reused for `min_interval`
+# seconds, so frequent scrapes from several Prometheus servers cost one
+# collection per interval.
+
+CONTENT_TYPE = "application/openmetrics-text; version=1.0.0; charset=utf-8"
+
+# Histogram bucket bounds in seconds (le labels)
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05,
+                   0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _number(value: float) -> str:
+    if value is None or math.isnan(value):
+        return "NaN"
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if float(value).is_integer() and abs(value) < 1e15:
+        return str(int(value))
+    return repr(float(value))
+
+
+class MetricFamily:
+    """One metric family: its metadata and samples"""
+
+    def __init__(self, name: str, kind: str, help: str, unit: str = ""):
+        self.name = name
+        self.kind = kind
+        self.help = help
+        self.unit = unit
+        self.samples: List[Tuple[str, Dict[str, str], float]] = []
+
+    def add(self, value: float, labels: Dict[str, str] = None, suffix: str = "") -> "MetricFamily":
+        self.samples.append((suffix, labels or {}, value))
+        return self
+
+    def add_histogram(self, histogram: Histogram, labels: Dict[str, str] = None, scale: float = 1e-9,
+                      buckets: Sequence[float] = LATENCY_BUCKETS) -> "MetricFamily":
+        """Samples of an instrumentation.Histogram; `scale` converts its units to seconds.
+
+        Each internal bucket is counted under the first bound its upper edge
+        fits in, so counts are exact to within one internal bucket (about 6%).
+        """
+        labels = labels or {}
+        cumulative = [0] * len(buckets)
+        for index, count in enumerate(histogram.counts):
+            if not count:
+                continue
+            upper = (bucket_bounds(index)[1] - 1) * scale
+            for position, bound in enumerate(buckets):
+                if upper <= bound:
+                    cumulative[position] += count
+                    break
+        running = 0
+        for bound, count in zip(buckets, cumulative):
+            running += count
+            self.add(running, dict(labels, le=_number(bound)), "_bucket")
+        self.add(histogram.count, dict(labels, le="+Inf"), "_bucket")
+        self.add(histogram.total * scale, labels, "_sum")
+        self.add(histogram.count, labels, "_count")
+        return self
+
+    def render(self) -> List[str]:
+        lines = [f"# TYPE {self.name} {self.kind}", f"# HELP {self.name} {_escape(self.help)}"]
+        if self.unit:
+            lines.append(f"# UNIT {self.name} {self.unit}")
+        for suffix, labels, value in self.samples:
+            label_text = ""
+            if labels:
+                label_text = "{" + ",".join(f'{key}="{_escape(val)}"' for key, val in labels.items()) + "}"
+            lines.append(f"{self.name}{suffix}{label_text} {_number(value)}")
+        return lines
+
+
+def render(families: Sequence[MetricFamily]) -> str:
+    lines = []
+    for family in families:
+        if family.samples:
+            lines.extend(family.render())
+    lines.append("# EOF")
+    return "\n".join(lines) + "\n"
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.split("?")[0] not in ("/metrics", "/"):
+            self.send_error(404)
+            return
+        try:
+            body = self.server.exporter.page().encode()
+            status, content_type = 200, CONTENT_TYPE
+        except Exception as e:
+            body = f"collection failed: {type(e).__name__}: {e}\n".encode()
+            status, content_type = 500, "text/plain; charset=utf-8"
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+class MetricsExporter:
+    """Serves collect() as OpenMetrics on http://host:port/metrics"""
+
+    def __init__(self, collect: Callable[[], Sequence[MetricFamily]], port: int = 9464,
+                 host: str = "127.0.0.1", min_interval: float = 1.0):
+        self.collect = collect
+        self.host = host
+        self.port = port
+        self.min_interval = min_interval
+        self._lock = threading.Lock()
+        self._page: Optional[str] = None
+        self._rendered_at = 0.0
+        self.collections = 0
+        self._server: Optional[ThreadingHTTPServer] = None
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}/metrics"
+
+    def page(self) -> str:
+        """The rendered metrics, collected again at most every min_interval seconds"""
+        with self._lock:
+            now = time.monotonic()
+            if self._page is None or now - self._rendered_at >= self.min_interval:
+                self._page = render(self.collect())
+                self._rendered_at = now
+                self.collections += 1
+            return self._page
+
+    def start(self) -> "MetricsExporter":
+        self._server = ThreadingHTTPServer((self.host, self.port), _MetricsHandler)
+        self._server.daemon_threads = True
+        self._server.exporter = self
+        self.port = self._server.server_address[1]
+        threading.Thread(target=self._server.serve_forever, name="metrics-exporter", daemon=True).start()
+        return self
+
+    def stop(self) -> None:
+        if self._server is not None:
+            self._server.shutdown()
+            self._server.server_close()
+            self._server = None
@@ -0,0 +1,252 @@
+import cProfile
+import io
+import json
+import marshal
+import os
+import pstats
+import sys
+import threading
+import time
+from collections import Counter, deque
+from contextlib import contextmanager
+from typing import Dict, List, Optional, Tuple
+
+from instrumentation import Histogram
+
+# Page profiling for the Streamlit router
+#
+# PageProfiler.page(name) wraps one page render: it always records the wall
+# time into a per-page histogram and a short list of recent reruns, and when
+# the session has an active Capture it also profiles the render:
+#   "cprofile"  deterministic cProfile, exported as a pstats file
+#               (python -m pstats, snakeviz, ...)
+#   "sampling"  a thread samples the rendering thread's stack every few
+#               milliseconds, exported in speedscope's JSON format
+# Captures belong to a session (kept in st.session_state) and cover its next
+# N page renders. Only one cProfile capture can run at a time per process;
+# a render that finds the profiler busy is timed but not profiled.
+
+SAMPLE_INTERVAL = 0.005
+RECENT_RERUNS = 100
+MODES = ("cprofile", "sampling")
+
+_cprofile_lock = threading.Lock()
+
+
+def _frame_key(code) -> Tuple[str, str, int]:
+    return code.co_name, code.co_filename, code.co_firstlineno
+
+
+class _StackSampler:
+    """Samples the calling thread's Python stack from a background thread.
+
+    Frames already on the stack when sampling starts (the script runner,
+    the router) are left out, so stacks start at the page function.
+    """
+
+    def __init__(self, interval: float = SAMPLE_INTERVAL):
+        self.thread_id = threading.get_ident()
+        self.interval = interval
+        self._outer = set()
+        frame = sys._getframe()
+        while frame is not None:
+            self._outer.add(id(frame))
+            frame = frame.f_back
+        self.stacks: Counter = Counter()
+        self._stop = threading.Event()
+        self._thread = threading.Thread(target=self._run, name="page-sampler", daemon=True)
+
+    def _run(self) -> None:
+        while not self._stop.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None and id(frame) not in self._outer:
+                stack.append(_frame_key(frame.f_code))
+                frame = frame.f_back
+            if stack:
+                self.stacks[tuple(reversed(stack))] += 1
+
+    def __enter__(self):
+        self._thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self._stop.set()
+        self._thread.join()
+        return False
+
+
+class Capture:
+    """Profile of a session's next `runs` page renders"""
+
+    def __init__(self, mode: str = "cprofile", runs: int = 5, interval: float = SAMPLE_INTERVAL):
+        if mode not in MODES:
+            raise ValueError(f"Unknown profiling mode: {mode}")
+        self.mode = mode
+        self.runs = runs
+        self.interval = interval
+        self.pages: List[Tuple[str, float]] = []
+        self.stats: Optional[pstats.Stats] = None
+        self.stacks: Counter = Counter()
+        self.skipped = 0
+
+    @property
+    def remaining(self) -> int:
+        return self.runs - len(self.pages)
+
+    @property
+    def done(self) -> bool:
+        return self.remaining <= 0
+
+    @contextmanager
+    def profile(self, page: str):
+        started = time.perf_counter()
+        if self.mode == "sampling":
+            with _StackSampler(self.interval) as sampler:
+                try:
+                    yield
+                finally:
+                    self.stacks.update(sampler.stacks)
+                    self.pages.append((page, time.perf_counter() - started))
+            return
+        if not _cprofile_lock.acquire(blocking=False):
+            self.skipped += 1
+            yield
+            return
+        profiler = cProfile.Profile()
+        try:
+            profiler.enable()
+            try:
+                yield
+            finally:
+                profiler.disable()
+                if self.stats is None:
+                    self.stats = pstats.Stats(profiler)
+                else:
+                    self.stats.add(profiler)
+                self.pages.append((page, time.perf_counter() - started))
+        finally:
+            _cprofile_lock.release()
+
+    # Results
+
+    def top_functions(self, limit: int = 25) -> List[Dict]:
+        """Most expensive functions, by cumulative time (cprofile) or samples (sampling)"""
+        if self.mode == "sampling":
+            return self._top_sampled(limit)
+        if self.stats is None:
+            return []
+        rows = []
+        for (filename, line, name), (_, calls, own, cumulative, _) in self.stats.stats.items():
+            rows.append({
+                "function": name,
+                "location": f"{os.path.basename(filename)}:{line}",
+                "calls": calls,
+                "own_ms": own * 1000,
+                "cumulative_ms": cumulative * 1000,
+            })
+        return sorted(rows, key=lambda row: row["cumulative_ms"], reverse=True)[:limit]
+
+    def _top_sampled(self, limit: int) -> List[Dict]:
+        own, total = Counter(), Counter()
+        for stack, count in self.stacks.items():
+            own[stack[-1]] += count
+            for frame in set(stack):
+                total[frame] += count
+        rows = [{
+            "function": name,
+            "location": f"{os.path.basename(filename)}:{line}",
+            "own_ms": own[(name, filename, line)] * self.interval * 1000,
+            "cumulative_ms": count * self.interval * 1000,
+            "samples": count,
+        } for (name, filename, line), count in total.items()]
+        return sorted(rows, key=lambda row: row["cumulative_ms"], reverse=True)[:limit]
+
+    def pstats_bytes(self) -> bytes:
+        """The cProfile capture in the format pstats.Stats(path) reads"""
+        if self.stats is None:
+            return b""
+        return marshal.dumps(self.stats.stats)
+
+    def speedscope(self, name: str = "TechDev page renders") -> str:
+        """The sampling capture as a speedscope file (https://www.speedscope.app)"""
+        frames: Dict[Tuple[str, str, int], int] = {}
+        samples, weights = [], []
+        for stack, count in self.stacks.items():
+            samples.append([frames.setdefault(frame, len(frames)) for frame in stack])
+            weights.append(count * self.interval * 1000)
+        document = {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "name": name,
+            "exporter": "techdev page_profiler",
+            "shared": {"frames": [{"name": n, "file": f, "line": l} for n, f, l in frames]},
+            "profiles": [{
+                "type": "sampled", "name": name, "unit": "milliseconds",
+                "startValue": 0, "endValue": sum(weights),
+                "samples": samples, "weights": weights,
+            }],
+        }
+        return json.dumps(document)
+
+    def summary_text(self, limit: int = 40) -> str:
+        """pstats' own report of the cProfile capture"""
+        if self.stats is None:
+            return ""
+        out = io.StringIO()
+        self.stats.stream = out
+        self.stats.sort_stats("cumulative").print_stats(limit)
+        return out.getvalue()
+
+
+class PageProfiler:
+    """Wall time of every page render, shared by the sessions of a process"""
+
+    def __init__(self, recent: int = RECENT_RERUNS):
+        self._lock = threading.Lock()
+        self._histograms: Dict[str, Histogram] = {}
+        self.recent = deque(maxlen=recent)
+
+    @contextmanager
+    def page(self, name: str, capture: Optional[Capture] = None):
+        started = time.perf_counter_ns()
+        try:
+            if capture is not None and not capture.done:
+                with capture.profile(name):
+                    yield
+            else:
+                yield
+        finally:
+            elapsed = time.perf_counter_ns() - started
+            with self._lock:
+                histogram = self._histograms.get(name)
+                if histogram is None:
+                    histogram = self._histograms[name] = Histogram()
+                histogram.record(elapsed)
+                self.recent.append((time.time(), name, elapsed / 1e6))
+
+    def summary(self) -> List[Dict]:
+        """Renders and p50/p95/p99/max milliseconds per page"""
+        with self._lock:
+            return [{
+                "page": name,
+                "renders": histogram.count,
+                "p50_ms": histogram.quantile(0.50) / 1e6,
+                "p95_ms": histogram.quantile(0.95) / 1e6,
+                "p99_ms": histogram.quantile(0.99) / 1e6,
+                "max_ms": histogram.max / 1e6,
+            } for name, histogram in sorted(self._histograms.items())]
+
+    def histograms(self) -> Dict[str, Histogram]:
+        """Copies of the per-page histograms (nanoseconds)"""
+        with self._lock:
+            copies = {}
+            for name, histogram in self._histograms.items():
+                copy = copies[name] = Histogram()
+                copy.merge(histogram)
+            return copies
+
+    def recent_reruns(self, limit: int = 20) -> List[Dict]:
+        with self._lock:
+            rows = list(self.recent)[-limit:]
+        return [{"at": time.strftime("%H:%M:%S", time.localtime(at)), "page": page, "wall_ms": ms}
+                for at, page, ms in reversed(rows)]
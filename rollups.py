@@ -0,0 +1,339 @@
+import json
+import os
+import threading
+from bisect import bisect_left, bisect_right, insort
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from sketches import DDSketch
+
+# Multi-resolution metric rollups
+#
+# For every resolution (1 minute, 1 hour, 1 day) each category keeps one
+# bucket per interval holding [count, sum, min, max] per metric name. A chart
+# over a week reads at most a few hundred buckets no matter how many raw
+# events were recorded, and buckets older than the resolution's retention
+# are pruned so the history stays bounded.
+#
+# Categories in SKETCH_CATEGORIES also keep a DDSketch (see sketches.py) per
+# bucket and metric name, so any percentile over any window comes from
+# merging a few hundred small sketches instead of scanning raw events.
+
+MINUTE = 60
+HOUR = 60 * MINUTE
+DAY = 24 * HOUR
+
+RESOLUTIONS = (MINUTE, HOUR, DAY)
+RESOLUTION_LABELS = {MINUTE: "1m", HOUR: "1h", DAY: "1d"}
+
+# Seconds of history kept at each resolution; "raw" applies to the
+# individual events in the segment log and the in-memory columns
+DEFAULT_RETENTION = {
+    "raw": 14 * DAY,
+    MINUTE: 1 * DAY,
+    HOUR: 90 * DAY,
+    DAY: 3 * 365 * DAY,
+}
+
+COUNT, SUM, MIN, MAX = range(4)
+
+SKETCH_CATEGORIES = ("system_performance",)
+
+
+class RollupSeries:
+    """Buckets of one category at one resolution, ordered by bucket start"""
+
+    def __init__(self):
+        self.starts: List[int] = []
+        self.buckets: Dict[int, Dict[str, List[float]]] = {}
+        self.sketches: Dict[int, Dict[str, DDSketch]] = {}
+
+    def bucket(self, start: int) -> Dict[str, List[float]]:
+        bucket = self.buckets.get(start)
+        if bucket is None:
+            bucket = self.buckets[start] = {}
+            if not self.starts or start > self.starts[-1]:
+                self.starts.append(start)
+            else:
+                insort(self.starts, start)
+        return bucket
+
+    def prune_before(self, cutoff: float) -> None:
+        drop = bisect_left(self.starts, cutoff)
+        for start in self.starts[:drop]:
+            del self.buckets[start]
+            self.sketches.pop(start, None)
+        del self.starts[:drop]
+
+    def range(self, start: Optional[float], end: Optional[float]) -> List[int]:
+        lo = 0 if start is None else bisect_left(self.starts, start)
+        hi = len(self.starts) if end is None else bisect_right(self.starts, end)
+        return self.starts[lo:hi]
+
+
+class RollupSet:
+    def __init__(self, resolutions: Iterable[int] = RESOLUTIONS, sketch_categories: Iterable[str] = SKETCH_CATEGORIES,
+                 retention: Dict = None):
+        self.resolutions = tuple(sorted(resolutions))
+        self.sketch_categories = frozenset(sketch_categories)
+        self.retention = dict(DEFAULT_RETENTION if retention is None else retention)
+        self._lock = threading.Lock()
+        self._series: Dict[int, Dict[str, RollupSeries]] = {res: {} for res in self.resolutions}
+
+    def add(self, category: str, metric_name: str, ts: float, value: float) -> None:
+        with self._lock:
+            self._add(category, metric_name, ts, value)
+
+    def _add(self, category: str, metric_name: str, ts: float, value: float) -> None:
+        sketched = category in self.sketch_categories
+        for res in self.resolutions:
+            series = self._series[res].get(category)
+            if series is None:
+                series = self._series[res][category] = RollupSeries()
+            start = int(ts // res) * res
+            bucket = series.bucket(start)
+            if sketched:
+                sketches = series.sketches.setdefault(start, {})
+                sketch = sketches.get(metric_name)
+                if sketch is None:
+                    sketch = sketches[metric_name] = DDSketch()
+                sketch.add(value)
+            stats = bucket.get(metric_name)
+            if stats is None:
+                bucket[metric_name] = [1, value, value, value]
+            else:
+                stats[COUNT] += 1
+                stats[SUM] += value
+                if value < stats[MIN]:
+                    stats[MIN] = value
+                if value > stats[MAX]:
+                    stats[MAX] = value
+
+    def _add_group(self, category: str, metric_name: str, ts: float, values: List[float]) -> None:
+        """Fold values that share a metric and a finest-resolution bucket"""
+        group = [len(values), sum(values), min(values), max(values)]
+        sketch = None
+        if category in self.sketch_categories:
+            sketch = DDSketch()
+            for value in values:
+                sketch.add(value)
+        for res in self.resolutions:
+            series = self._series[res].get(category)
+            if series is None:
+                series = self._series[res][category] = RollupSeries()
+            start = int(ts // res) * res
+            bucket = series.bucket(start)
+            if sketch is not None:
+                sketches = series.sketches.setdefault(start, {})
+                target = sketches.get(metric_name)
+                if target is None:
+                    target = sketches[metric_name] = DDSketch()
+                target.merge(sketch)
+            stats = bucket.get(metric_name)
+            if stats is None:
+                bucket[metric_name] = list(group)
+            else:
+                stats[COUNT] += group[COUNT]
+                stats[SUM] += group[SUM]
+                if group[MIN] < stats[MIN]:
+                    stats[MIN] = group[MIN]
+                if group[MAX] > stats[MAX]:
+                    stats[MAX] = group[MAX]
+
+    def add_many(self, points: Iterable[Tuple[str, str, float, float]]) -> None:
+        """Fold (category, metric_name, ts, value) points.
+
+        Points are grouped by metric and finest bucket first, so a batch of
+        many points costs one bucket update per group and resolution; the
+        coarser resolutions are multiples of the finest one.
+        """
+        finest = self.resolutions[0]
+        groups: Dict[Tuple[str, str, int], List[float]] = {}
+        for category, metric_name, ts, value in points:
+            key = (category, metric_name, int(ts // finest) * finest)
+            values = groups.get(key)
+            if values is None:
+                groups[key] = [value]
+            else:
+                values.append(value)
+        with self._lock:
+            for (category, metric_name, start), values in groups.items():
+                if len(values) == 1:
+                    self._add(category, metric_name, start, values[0])
+                else:
+                    self._add_group(category, metric_name, start, values)
+
+    def prune(self, now: float, retention: Dict = None) -> None:
+        """Drop buckets older than each resolution's retention"""
+        retention = self.retention if retention is None else retention
+        with self._lock:
+            for res in self.resolutions:
+                keep = retention.get(res)
+                if keep is None:
+                    continue
+                for series in self._series[res].values():
+                    series.prune_before(now - keep)
+
+    def oldest(self, resolution: int) -> Optional[int]:
+        with self._lock:
+            starts = [s.starts[0] for s in self._series[resolution].values() if s.starts]
+        return min(starts) if starts else None
+
+    def choose_resolution(self, start: float, end: float, max_points: int = 500, now: float = None) -> int:
+        """Finest resolution that draws the window in at most max_points buckets.
+
+        A resolution only qualifies if its retention reaches back from `now`
+        (default: `end`) to `start`, so nothing in the window has been pruned
+        from it; how much data has been recorded so far does not matter.
+        """
+        now = end if now is None else now
+        span = max(end - start, 1)
+        for res in self.resolutions:
+            if span / res > max_points:
+                continue
+            keep = self.retention.get(res)
+            if keep is None or now - keep <= start:
+                return res
+        return self.resolutions[-1]
+
+    def query(self, category: str, resolution: int, start: Optional[float] = None,
+              end: Optional[float] = None, metric_name=None) -> List[Tuple[int, str, List[float]]]:
+        """(bucket_start, metric_name, [count, sum, min, max]) rows in time order"""
+        names = None
+        if metric_name is not None:
+            names = {metric_name} if isinstance(metric_name, str) else set(metric_name)
+        with self._lock:
+            series = self._series[resolution].get(category)
+            if series is None:
+                return []
+            rows = []
+            for bucket_start in series.range(start, end):
+                for name, stats in series.buckets[bucket_start].items():
+                    if names is None or name in names:
+                        rows.append((bucket_start, name, list(stats)))
+        return rows
+
+    def totals(self, category: str, start: Optional[float] = None, end: Optional[float] = None,
+               metric_name=None) -> Dict[str, List[float]]:
+        """[count, sum, min, max] per metric over a window, from the coarsest buckets"""
+        merged: Dict[str, List[float]] = {}
+        for _, name, stats in self.query(category, self.resolutions[-1], start, end, metric_name):
+            current = merged.get(name)
+            if current is None:
+                merged[name] = stats
+            else:
+                current[COUNT] += stats[COUNT]
+                current[SUM] += stats[SUM]
+                current[MIN] = min(current[MIN], stats[MIN])
+                current[MAX] = max(current[MAX], stats[MAX])
+        return merged
+
+    def sketch(self, category: str, start: Optional[float] = None, end: Optional[float] = None,
+               metric_name=None, max_buckets: int = 500, now: float = None) -> DDSketch:
+        """Merged sketch of a window, from the finest resolution that covers it.
+
+        Buckets are included whole, so the window's edges are only as exact
+        as the chosen resolution (see choose_resolution); without both
+        bounds the coarsest buckets are used.
+        """
+        names = None
+        if metric_name is not None:
+            names = {metric_name} if isinstance(metric_name, str) else set(metric_name)
+        if start is None or end is None:
+            resolution = self.resolutions[-1]
+        else:
+            resolution = self.choose_resolution(start, end, max_buckets, now)
+        if start is not None:
+            # The bucket holding `start` begins before it
+            start = int(start // resolution) * resolution
+        merged = DDSketch()
+        with self._lock:
+            series = self._series[resolution].get(category)
+            if series is None:
+                return merged
+            for bucket_start in series.range(start, end):
+                for name, sketch in series.sketches.get(bucket_start, {}).items():
+                    if names is None or name in names:
+                        merged.merge(sketch)
+        return merged
+
+    def to_dict(self) -> Dict:
+        with self._lock:
+            return {
+                str(res): {
+                    category: {str(start): series.buckets[start] for start in series.starts}
+                    for category, series in by_category.items()
+                }
+                for res, by_category in self._series.items()
+            }
+
+    def sketches_to_dict(self) -> Dict:
+        with self._lock:
+            return {
+                str(res): {
+                    category: {
+                        str(start): {name: sketch.to_dict() for name, sketch in series.sketches[start].items()}
+                        for start in series.starts if start in series.sketches
+                    }
+                    for category, series in by_category.items() if series.sketches
+                }
+                for res, by_category in self._series.items()
+            }
+
+    def load_sketches(self, data: Dict) -> None:
+        with self._lock:
+            for res_key, by_category in data.items():
+                res = int(res_key)
+                if res not in self._series:
+                    continue
+                for category, buckets in by_category.items():
+                    series = self._series[res].setdefault(category, RollupSeries())
+                    for start_key, sketches in buckets.items():
+                        start = int(start_key)
+                        series.bucket(start)
+                        series.sketches[start] = {name: DDSketch.from_dict(sketch)
+                                                  for name, sketch in sketches.items()}
+
+    def load(self, other: "RollupSet") -> None:
+        """Add a copy of another set's buckets and sketches"""
+        self.load_dict(other.to_dict())
+        self.load_sketches(other.sketches_to_dict())
+
+    def load_dict(self, data: Dict) -> None:
+        with self._lock:
+            for res_key, by_category in data.items():
+                res = int(res_key)
+                if res not in self._series:
+                    continue
+                for category, buckets in by_category.items():
+                    series = self._series[res].setdefault(category, RollupSeries())
+                    for start_key, stats_by_name in buckets.items():
+                        bucket = series.bucket(int(start_key))
+                        for name, stats in stats_by_name.items():
+                            bucket[name] = list(stats)
+
+
+def load_rollup_file(path: str, retention: Dict = None) -> Tuple[RollupSet, int]:
+    """Read persisted rollups and the last segment number they cover"""
+    rollups = RollupSet(retention=retention)
+    if not os.path.exists(path):
+        return rollups, 0
+    try:
+        with open(path, "r") as f:
+            data = json.load(f)
+        rollups.load_dict(data.get("resolutions", {}))
+        rollups.load_sketches(data.get("sketches", {}))
+        return rollups, int(data.get("compacted_through", 0))
+    except (OSError, ValueError):
+        return RollupSet(retention=retention), 0
+
+
+def save_rollup_file(path: str, rollups: RollupSet, compacted_through: int) -> None:
+    """Atomically replace the persisted rollups"""
+    tmp_path = path + ".tmp"
+    with open(tmp_path, "w") as f:
+        json.dump({"compacted_through": compacted_through, "resolutions": rollups.to_dict(),
+                   "sketches": rollups.sketches_to_dict()},
+                  f, separators=(",", ":"))
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp_path, path)
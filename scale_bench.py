@@ -0,0 +1,349 @@
+import argparse
+import csv
+import importlib
+import json
+import logging
+import os
+import platform
+import random
+import shutil
+import statistics
+import sys
+import tempfile
+import time
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Iterator, List, Tuple
+
+from benchmark_log import SegmentLog
+from standup_store import COLUMNS, StandupStore
+from storage import MAX_TEAM_SIZE, TEAMS_DOC, TECH_LEADS_DOC, USERS_DOC, get_storage
+
+# Synthetic-data benchmarks for the data and metrics paths
+#
+#   python scale_bench.py                               # small preset
+#   python scale_bench.py --preset large --storage sqlite
+#   python scale_bench.py --output results.json --save-baseline baseline.json
+#   python scale_bench.py --baseline baseline.json      # exit 1 on regressions
+#
+# Generates users, teams with members, tech leads, metric events and standup
+# rows into a scratch directory, imports Home.py there (its page code only
+# runs under `streamlit run`) and times each scenario several times against
+# that data. Generation is seeded, so two runs with the same sizes and seed
+# measure the same dataset. Results are JSON; comparing against a baseline
+# flags scenarios whose median got slower by more than the tolerance.
+
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+
+PRESETS = {
+    "small": {"users": 10_000, "teams": 1_000, "events": 100_000, "standups": 20_000},
+    "medium": {"users": 100_000, "teams": 10_000, "events": 300_000, "standups": 100_000},
+    "large": {"users": 1_000_000, "teams": 100_000, "events": 1_000_000, "standups": 1_000_000},
+}
+ROLES = ("Developer Intern", "Developer Intern", "Developer Intern", "Tech Lead", "")
+METRICS = {
+    "user_engagement": ("login_success", "login_failure", "user_registration", "role_registration"),
+    "system_performance": tuple(f"{kind}_{doc}" for kind in ("file_load", "file_save")
+                                for doc in (USERS_DOC, TEAMS_DOC, TECH_LEADS_DOC)) + ("stats_calculation",),
+    "team_productivity": ("active_teams",),
+}
+WORDS = ("docker", "supabase", "auth", "streamlit", "deploy", "pipeline", "review", "tests", "api",
+         "refactor", "schema", "dashboard", "cache", "gitlab", "merge", "bug", "fix", "python",
+         "sql", "index", "query", "learned", "pairing", "design", "ci", "logging", "metrics")
+EVENT_DAYS = 13  # inside the 14 day raw retention, so every event stays in memory
+STANDUP_DAYS = 90
+REGRESSION_TOLERANCE = 0.25
+NOISE_FLOOR_MS = 0.05
+
+
+# Generators
+
+def generate_users(count: int, rng: random.Random) -> Dict[str, Dict]:
+    start = datetime(2025, 1, 1)
+    return {
+        f"user{i:07d}@example.com": {
+            "role": rng.choice(ROLES),
+            "registered_at": (start + timedelta(minutes=i)).isoformat(),
+        }
+        for i in range(count)
+    }
+
+
+def generate_teams(count: int, users: List[str], rng: random.Random) -> Dict[str, Dict]:
+    start = datetime(2025, 6, 1)
+    teams = {}
+    for i in range(count):
+        created = start + timedelta(hours=i)
+        members = [
+            {
+                "name": f"Member {i}-{j}",
+                "gitlab_username": f"gl-{i}-{j}",
+                "added_at": (created + timedelta(days=j)).isoformat(),
+            }
+            for j in range(rng.randint(1, MAX_TEAM_SIZE))
+        ]
+        teams[f"team_{i:07d}"] = {
+            "leader": users[rng.randrange(len(users))],
+            "created_at": created.isoformat(),
+            "members": members,
+        }
+    return teams
+
+
+def generate_tech_leads(users: Dict[str, Dict]) -> Dict[str, Dict]:
+    return {
+        email: {"token_hash": f"{hash(email) & 0xffffffffffff:012x}", "registered_at": user["registered_at"],
+                "status": "active", "permissions": "full_access"}
+        for email, user in users.items() if user["role"] == "Tech Lead"
+    }
+
+
+def generate_events(count: int, rng: random.Random, days: int = EVENT_DAYS) -> Iterator[Dict]:
+    """Metric records spread over the last `days` days, oldest first"""
+    now = datetime.now()
+    span = days * 86400
+    categories = list(METRICS)
+    for i in range(count):
+        category = rng.choice(categories)
+        timestamp = now - timedelta(seconds=span * (1 - i / count))
+        value = 1 if category == "user_engagement" else round(rng.expovariate(50), 6)
+        yield {"category": category, "metric_name": rng.choice(METRICS[category]),
+               "value": value, "timestamp": timestamp.isoformat()}
+
+
+def generate_standups(count: int, students: int, rng: random.Random,
+                      days: int = STANDUP_DAYS) -> Iterator[Dict]:
+    now = datetime.now()
+    span = days * 1440
+    for i in range(count):
+        date = now - timedelta(minutes=span * (1 - i / count))
+        yield {
+            "Date": date.strftime("%Y-%m-%d %H:%M"),
+            "Student ID": str(1000 + rng.randrange(students)),
+            "Tasks Done": " ".join(rng.choices(WORDS, k=rng.randint(4, 12))),
+            "What Learned": " ".join(rng.choices(WORDS, k=rng.randint(3, 8))),
+        }
+
+
+def build_dataset(workdir: str, sizes: Dict[str, int], seed: int) -> Dict[str, float]:
+    """Write a synthetic dataset into workdir; returns seconds spent per part"""
+    rng = random.Random(seed)
+    timings = {}
+
+    started = time.perf_counter()
+    storage = get_storage()
+    users = generate_users(sizes["users"], rng)
+    storage.save(USERS_DOC, users)
+    storage.save(TEAMS_DOC, generate_teams(sizes["teams"], list(users), rng))
+    storage.save(TECH_LEADS_DOC, generate_tech_leads(users))
+    timings["documents"] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    log = SegmentLog(os.path.join(workdir, "performance_benchmarks"))
+    batch = []
+    for record in generate_events(sizes["events"], rng):
+        batch.append(record)
+        if len(batch) == 10000:
+            log.append_many(batch)
+            batch = []
+    log.append_many(batch)
+    timings["events"] = time.perf_counter() - started
+
+    started = time.perf_counter()
+    path = os.path.join(workdir, "developer_standup.csv")
+    with open(path, "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=COLUMNS, lineterminator="\n")
+        writer.writeheader()
+        writer.writerows(generate_standups(sizes["standups"], max(sizes["users"] // 10, 1), rng))
+    StandupStore(path).rebuild_index()
+    timings["standups"] = time.perf_counter() - started
+    return {name: round(seconds, 3) for name, seconds in timings.items()}
+
+
+# Scenarios
+
+def _stats(samples: List[float]) -> Dict[str, float]:
+    ordered = sorted(samples)
+    p95 = ordered[min(len(ordered) - 1, int(round(0.95 * (len(ordered) - 1))))]
+    return {
+        "runs": len(ordered),
+        "min_ms": round(ordered[0] * 1000, 4),
+        "median_ms": round(statistics.median(ordered) * 1000, 4),
+        "p95_ms": round(p95 * 1000, 4),
+        "mean_ms": round(statistics.fmean(ordered) * 1000, 4),
+    }
+
+
+def time_scenario(run: Callable[[], object], repeat: int, warmup: int = 1,
+                  setup: Callable[[], object] = None) -> Dict[str, float]:
+    """Timing stats of `run`; `setup` runs untimed before every call"""
+    samples = []
+    for i in range(warmup + repeat):
+        if setup is not None:
+            setup()
+        started = time.perf_counter()
+        run()
+        elapsed = time.perf_counter() - started
+        if i >= warmup:
+            samples.append(elapsed)
+    return _stats(samples)
+
+
+def scenarios(home, workdir: str, repeat: int) -> Iterator[Tuple[str, Callable[[], Dict]]]:
+    """(name, measure) pairs; Home must be imported with workdir as cwd"""
+    monitor = home.performance_monitor
+    cache = home.document_cache
+    teams = home.load_data(home.TEAMS_FILE)
+    store = StandupStore(os.path.join(workdir, "developer_standup.csv"))
+    submit_count = [0]
+
+    def submit_standup():
+        submit_count[0] += 1
+        store.append({"Date": datetime.now().strftime("%Y-%m-%d %H:%M"), "Student ID": "bench",
+                      "Tasks Done": f"benchmark standup {submit_count[0]}", "What Learned": "timing"})
+
+    def dashboard_kpis():
+        monitor.count_metrics('user_engagement', days=1)
+        monitor.quantiles('system_performance', days=1,
+                          metric_name=monitor.metric_names('system_performance', prefix='file_load'))
+
+    def dashboard_charts():
+        for _, category, kind, column, title, _ in home.TREND_CHARTS:
+            home.build_trend_figure(category, kind, column, title)
+
+    def metrics_startup():
+        benchmark = home.PerformanceBenchmark()
+        benchmark.close()
+
+    slow = max(2, repeat // 4)
+    yield "load_data.users.cold", lambda: time_scenario(
+        lambda: home.load_data(home.USERS_FILE), slow, setup=lambda: cache.invalidate(home.USERS_FILE))
+    yield "load_data.users.warm", lambda: time_scenario(lambda: home.load_data(home.USERS_FILE), repeat)
+    yield "load_data.teams.cold", lambda: time_scenario(
+        lambda: home.load_data(home.TEAMS_FILE), slow, setup=lambda: cache.invalidate(home.TEAMS_FILE))
+    yield "load_snapshot.teams.warm", lambda: time_scenario(lambda: home.load_snapshot(home.TEAMS_FILE), repeat)
+    yield "save_data.teams", lambda: time_scenario(lambda: home.save_data(teams, home.TEAMS_FILE), slow)
+    yield "get_all_teams", lambda: time_scenario(lambda: sum(1 for _ in home.get_all_teams()), slow)
+    yield "get_teams_page", lambda: time_scenario(lambda: home.get_teams_page(25, sort='member_count'), repeat)
+    yield "get_platform_stats", lambda: time_scenario(home.get_platform_stats, repeat)
+    yield "get_benchmark_data.system_performance.7d", lambda: time_scenario(
+        lambda: monitor.get_benchmark_data('system_performance', 7), repeat)
+    yield "dashboard.kpis", lambda: time_scenario(dashboard_kpis, repeat)
+    yield "dashboard.trend_charts", lambda: time_scenario(dashboard_charts, slow)
+    yield "metrics.startup", lambda: time_scenario(metrics_startup, slow)
+    yield "standup.submit", lambda: time_scenario(submit_standup, repeat)
+
+
+def import_home(workdir: str):
+    """Import Home.py with workdir as the data directory"""
+    os.chdir(workdir)
+    if APP_DIR not in sys.path:
+        sys.path.insert(0, APP_DIR)
+    home = importlib.import_module("Home")
+    # Outside `streamlit run` every session_state/cache access logs a warning
+    for name in list(logging.root.manager.loggerDict):
+        if name.startswith("streamlit"):
+            logging.getLogger(name).setLevel(logging.ERROR)
+    return home
+
+
+def run_suite(sizes: Dict[str, int], repeat: int = 20, seed: int = 0, storage: str = "json",
+              only: List[str] = None, workdir: str = None) -> Dict:
+    keep = workdir is not None
+    workdir = os.path.abspath(workdir or tempfile.mkdtemp(prefix="techdev-bench-"))
+    os.makedirs(workdir, exist_ok=True)
+    previous_cwd = os.getcwd()
+    os.environ["TECHDEV_STORAGE"] = storage
+    os.environ["TECHDEV_DATA_DIR"] = workdir
+    os.environ["TECHDEV_DB"] = os.path.join(workdir, "techdev.db")
+    try:
+        os.chdir(workdir)
+        generation = build_dataset(workdir, sizes, seed)
+        home = import_home(workdir)
+        results = {}
+        for name, measure in scenarios(home, workdir, repeat):
+            if only and not any(name.startswith(prefix) for prefix in only):
+                continue
+            results[name] = measure()
+        home.performance_monitor.close()
+    finally:
+        os.chdir(previous_cwd)
+        if not keep:
+            shutil.rmtree(workdir, ignore_errors=True)
+    return {
+        "meta": {
+            "sizes": sizes, "seed": seed, "storage": storage, "repeat": repeat,
+            "generation_seconds": generation,
+            "python": platform.python_version(), "platform": platform.platform(),
+            "created_at": datetime.now().isoformat(timespec="seconds"),
+        },
+        "results": results,
+    }
+
+
+# Baselines
+
+def compare(current: Dict, baseline: Dict, tolerance: float = REGRESSION_TOLERANCE) -> List[Dict]:
+    """Median of each scenario against the baseline; `regression` marks slowdowns beyond tolerance"""
+    rows = []
+    for name, result in current["results"].items():
+        base = baseline.get("results", {}).get(name)
+        if base is None:
+            continue
+        before, after = base["median_ms"], result["median_ms"]
+        ratio = after / before if before else float("inf")
+        rows.append({
+            "scenario": name, "baseline_ms": before, "current_ms": after, "ratio": round(ratio, 3),
+            "regression": ratio > 1 + tolerance and after - before > NOISE_FLOOR_MS,
+        })
+    return rows
+
+
+def main(argv: List[str] = None) -> int:
+    parser = argparse.ArgumentParser(description="Synthetic-data benchmarks for the TechDev data paths")
+    parser.add_argument("--preset", choices=sorted(PRESETS), default="small")
+    for size in ("users", "teams", "events", "standups"):
+        parser.add_argument(f"--{size}", type=int, help=f"number of {size} (overrides the preset)")
+    parser.add_argument("--storage", choices=("json", "sqlite"), default="json")
+    parser.add_argument("--repeat", type=int, default=20, help="timed runs of fast scenarios")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--only", nargs="*", help="scenario name prefixes to run")
+    parser.add_argument("--workdir", help="keep the generated data here instead of a temp dir")
+    parser.add_argument("--output", help="write the results JSON to this file")
+    parser.add_argument("--baseline", help="compare against a results JSON file")
+    parser.add_argument("--save-baseline", help="also write the results as a baseline file")
+    parser.add_argument("--tolerance", type=float, default=REGRESSION_TOLERANCE,
+                        help="allowed median slowdown before a scenario counts as a regression")
+    args = parser.parse_args(argv)
+
+    sizes = dict(PRESETS[args.preset])
+    for size in sizes:
+        if getattr(args, size) is not None:
+            sizes[size] = getattr(args, size)
+    report = run_suite(sizes, args.repeat, args.seed, args.storage, args.only, args.workdir)
+
+    for path in (args.output, args.save_baseline):
+        if path:
+            with open(path, "w") as f:
+                json.dump(report, f, indent=2)
+
+    print(f"sizes {sizes} storage={args.storage}; generated in {report['meta']['generation_seconds']}")
+    print(f"{'scenario':44} {'median ms':>11} {'p95 ms':>11} {'runs':>5}")
+    for name, result in report["results"].items():
+        print(f"{name:44} {result['median_ms']:>11.3f} {result['p95_ms']:>11.3f} {result['runs']:>5}")
+
+    if not args.baseline:
+        return 0
+    with open(args.baseline, "r") as f:
+        baseline = json.load(f)
+    if baseline.get("meta", {}).get("sizes") != sizes:
+        print(f"\nwarning: baseline sizes {baseline.get('meta', {}).get('sizes')} differ from this run")
+    rows = compare(report, baseline, args.tolerance)
+    print(f"\n{'scenario':44} {'baseline':>11} {'current':>11} {'ratio':>7}")
+    for row in rows:
+        flag = "  REGRESSION" if row["regression"] else ""
+        print(f"{row['scenario']:44} {row['baseline_ms']:>11.3f} {row['current_ms']:>11.3f} {row['ratio']:>7.2f}{flag}")
+    return 1 if any(row["regression"] for row in rows) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
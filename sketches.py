@@ -0,0 +1,137 @@
+import math
+from typing import Dict, List, Optional
+
+# Mergeable quantile sketches (DDSketch)
+#
+# A value v > 0 lands in bin ceil(log(v) / log(gamma)) with
+# gamma = (1 + a) / (1 - a), so every bin spans a relative range of 2a and a
+# quantile read back from a bin is within a (1%) of a true value at that rank.
+# Bins are a dense list from the lowest occupied key; latencies from 10µs to
+# 100s need under 1200 of them, and a bucket of similar load times usually
+# needs a few dozen. Two sketches merge by adding bins, so per-bucket
+# sketches combine into any window. Values at or below MIN_VALUE (including
+# zero and negatives, which latencies and counts never are) share one bin.
+
+RELATIVE_ACCURACY = 0.01
+MIN_VALUE = 1e-9
+MAX_BINS = 2048
+
+GAMMA = (1 + RELATIVE_ACCURACY) / (1 - RELATIVE_ACCURACY)
+_LOG_GAMMA = math.log(GAMMA)
+
+
+def bin_key(value: float) -> int:
+    return math.ceil(math.log(value) / _LOG_GAMMA)
+
+
+def bin_value(key: int) -> float:
+    """Representative value of a bin, within RELATIVE_ACCURACY of anything in it"""
+    return 2 * GAMMA ** key / (GAMMA + 1)
+
+
+class DDSketch:
+    """Quantile sketch with RELATIVE_ACCURACY relative error"""
+
+    __slots__ = ("offset", "bins", "zero", "count", "min", "max")
+
+    def __init__(self):
+        self.offset = 0
+        self.bins: List[int] = []
+        self.zero = 0
+        self.count = 0
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+
+    def add(self, value: float, weight: int = 1) -> None:
+        self.count += weight
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+        if value <= MIN_VALUE:
+            self.zero += weight
+            return
+        self._add_bin(bin_key(value), weight)
+
+    def _add_bin(self, key: int, weight: int) -> None:
+        bins = self.bins
+        if not bins:
+            self.offset = key
+            bins.append(weight)
+            return
+        index = key - self.offset
+        if index < 0:
+            bins[:0] = [0] * -index
+            self.offset = key
+            index = 0
+        elif index >= len(bins):
+            bins.extend([0] * (index + 1 - len(bins)))
+        bins[index] += weight
+        if len(bins) > MAX_BINS:
+            # Fold the lowest bins into one; only the smallest values lose accuracy
+            excess = len(bins) - MAX_BINS
+            folded = sum(bins[:excess + 1])
+            del bins[:excess]
+            bins[0] = folded
+            self.offset += excess
+
+    def merge(self, other: "DDSketch") -> None:
+        if not other.count:
+            return
+        self.count += other.count
+        self.zero += other.zero
+        if self.min is None or other.min < self.min:
+            self.min = other.min
+        if self.max is None or other.max > self.max:
+            self.max = other.max
+        for index, weight in enumerate(other.bins):
+            if weight:
+                self._add_bin(other.offset + index, weight)
+
+    def quantile(self, q: float) -> Optional[float]:
+        """Approximate q-quantile (0 <= q <= 1), or None when empty"""
+        if not self.count:
+            return None
+        rank = q * (self.count - 1)
+        seen = self.zero
+        if seen > rank:
+            return self.min
+        for index, weight in enumerate(self.bins):
+            seen += weight
+            if seen > rank:
+                return min(max(bin_value(self.offset + index), self.min), self.max)
+        return self.max
+
+    def to_dict(self) -> Dict:
+        """Compact form: dense bins, or gaps between occupied bins and their counts"""
+        occupied = [(index, weight) for index, weight in enumerate(self.bins) if weight]
+        data = {"z": self.zero, "min": self.min, "max": self.max}
+        if not occupied:
+            return data
+        lo, hi = occupied[0][0], occupied[-1][0] + 1
+        data["o"] = self.offset + lo
+        if 2 * len(occupied) >= hi - lo:
+            data["b"] = self.bins[lo:hi]
+        else:
+            data["g"] = [index - previous for (index, _), (previous, _) in zip(occupied[1:], occupied)]
+            data["c"] = [weight for _, weight in occupied]
+        return data
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> "DDSketch":
+        sketch = cls()
+        sketch.offset = int(data.get("o", 0))
+        if "c" in data:
+            counts = data["c"]
+            sketch.bins = [0] * (1 + sum(data["g"]))
+            index = 0
+            for gap, weight in zip([0] + data["g"], counts):
+                index += gap
+                sketch.bins[index] = int(weight)
+        else:
+            sketch.bins = [int(weight) for weight in data.get("b", [])]
+        sketch.zero = int(data.get("z", 0))
+        sketch.count = sketch.zero + sum(sketch.bins)
+        sketch.min = data.get("min")
+        sketch.max = data.get("max")
+        return sketch
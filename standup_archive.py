@@ -0,0 +1,287 @@
+import json
+import os
+import threading
+from datetime import date, datetime
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from standup_store import COLUMNS, StandupStore, parse_date
+from storage import FileLock
+
+try:
+    import pyarrow as pa
+    import pyarrow.compute as pc
+    import pyarrow.dataset as ds
+    import pyarrow.parquet as pq
+except ImportError:  # the archive is optional; the live log works without it
+    pa = None
+
+# Columnar standup archive
+#
+# The append log (standup_store) stays the source of truth. A compactor
+# copies the records it has not archived yet into Parquet files partitioned
+# by month:
+#
+#   standup_archive/month=2025-01/part-0000000000-0000000412.parquet
+#
+# Each part holds the log records [start, stop) that fall in that month,
+# with a real timestamp Date, a dictionary-encoded Student ID and rows
+# sorted by Student ID then Date so row-group statistics prune on both.
+# _state.json records how far the log has been archived; parts beyond that
+# mark are leftovers of an interrupted compaction and are ignored and then
+# replaced. When a month collects too many parts they are merged into one,
+# and a part whose range lies inside another's is a merge leftover.
+#
+# query() only opens the month directories overlapping the date range,
+# reads the requested columns with the filters pushed into the Parquet scan,
+# memory-maps the files, and adds matching records from the log that are
+# not archived yet. Requires pyarrow.
+
+DEFAULT_ARCHIVE_DIR = "standup_archive"
+UNDATED = "undated"
+MAX_PARTS_PER_MONTH = 8
+ROW_GROUP_SIZE = 16384
+
+
+def available() -> bool:
+    return pa is not None
+
+
+def _schema():
+    return pa.schema([
+        ("Date", pa.timestamp("us")),
+        ("Student ID", pa.dictionary(pa.int32(), pa.string())),
+        ("Tasks Done", pa.string()),
+        ("What Learned", pa.string()),
+    ])
+
+
+def _to_table(records: List[Dict]):
+    dates = [parse_date(record.get("Date")) for record in records]
+    return pa.table({
+        "Date": pa.array(dates, pa.timestamp("us")),
+        "Student ID": pa.array([record.get("Student ID") for record in records], pa.string()).dictionary_encode(),
+        "Tasks Done": pa.array([record.get("Tasks Done") for record in records], pa.string()),
+        "What Learned": pa.array([record.get("What Learned") for record in records], pa.string()),
+    }, schema=_schema())
+
+
+def _sorted(table):
+    """Rows ordered by Student ID then Date (dictionary columns cannot be sort keys)"""
+    keys = pa.table({"student": table["Student ID"].cast(pa.string()), "date": table["Date"]})
+    return table.take(pc.sort_indices(keys, sort_keys=[("student", "ascending"), ("date", "ascending")]))
+
+
+def _month_key(dt: Optional[datetime]) -> str:
+    return UNDATED if dt is None else f"{dt.year:04d}-{dt.month:02d}"
+
+
+def _part_range(name: str) -> Optional[Tuple[int, int]]:
+    if not (name.startswith("part-") and name.endswith(".parquet")):
+        return None
+    try:
+        start, stop = name[len("part-"):-len(".parquet")].split("-")
+        return int(start), int(stop)
+    except ValueError:
+        return None
+
+
+class StandupArchive:
+    def __init__(self, store: StandupStore, directory: str = DEFAULT_ARCHIVE_DIR,
+                 max_parts_per_month: int = MAX_PARTS_PER_MONTH):
+        if pa is None:
+            raise RuntimeError("The standup archive needs pyarrow (pip install pyarrow)")
+        self.store = store
+        self.directory = directory
+        self.max_parts_per_month = max_parts_per_month
+        self._state_path = os.path.join(directory, "_state.json")
+        self._lock_path = os.path.join(directory, ".compact.lock")
+        self._stop = threading.Event()
+        self._thread = None
+        os.makedirs(directory, exist_ok=True)
+
+    # Layout
+
+    def archived_through(self) -> int:
+        """Number of log records copied into the archive"""
+        try:
+            with open(self._state_path, "r") as f:
+                return int(json.load(f).get("archived_through", 0))
+        except (OSError, ValueError):
+            return 0
+
+    def _set_archived_through(self, count: int) -> None:
+        tmp_path = self._state_path + ".tmp"
+        with open(tmp_path, "w") as f:
+            json.dump({"archived_through": count}, f)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, self._state_path)
+
+    def months(self) -> List[str]:
+        return sorted(name[len("month="):] for name in os.listdir(self.directory)
+                      if name.startswith("month="))
+
+    def _month_dir(self, month: str) -> str:
+        return os.path.join(self.directory, f"month={month}")
+
+    def _parts(self, month: str, through: int) -> List[Tuple[int, int, str]]:
+        """Committed parts of a month, without ones a merge has superseded"""
+        directory = self._month_dir(month)
+        parts = []
+        for name in os.listdir(directory):
+            part = _part_range(name)
+            if part is not None and part[1] <= through:
+                parts.append((part[0], part[1], os.path.join(directory, name)))
+        return [
+            part for part in parts
+            if not any(other is not part and other[0] <= part[0] and part[1] <= other[1] for other in parts)
+        ]
+
+    # Compaction
+
+    def compact(self) -> int:
+        """Archive the log records not archived yet; returns how many were added"""
+        with FileLock(self._lock_path):
+            start = self.archived_through()
+            stop = self.store.count()
+            self._remove_stale(start)
+            if stop <= start:
+                return 0
+            by_month: Dict[str, List[Dict]] = {}
+            for record in self.store.iter_range(start, stop):
+                by_month.setdefault(_month_key(parse_date(record.get("Date"))), []).append(record)
+            for month, records in by_month.items():
+                table = _sorted(_to_table(records))
+                self._write_part(month, start, stop, table)
+            self._set_archived_through(stop)
+            for month in by_month:
+                self._merge_month(month, stop)
+            return stop - start
+
+    def _write_part(self, month: str, start: int, stop: int, table) -> None:
+        directory = self._month_dir(month)
+        os.makedirs(directory, exist_ok=True)
+        path = os.path.join(directory, f"part-{start:010d}-{stop:010d}.parquet")
+        tmp_path = path + ".tmp"
+        pq.write_table(table, tmp_path, row_group_size=ROW_GROUP_SIZE)
+        os.replace(tmp_path, path)
+
+    def _remove_stale(self, through: int) -> None:
+        """Delete parts of an interrupted compaction or merge"""
+        for month in self.months():
+            directory = self._month_dir(month)
+            live = {path for _, _, path in self._parts(month, through)}
+            for name in os.listdir(directory):
+                path = os.path.join(directory, name)
+                if _part_range(name) is not None and path not in live:
+                    os.remove(path)
+
+    def _merge_month(self, month: str, through: int) -> None:
+        parts = self._parts(month, through)
+        if len(parts) <= self.max_parts_per_month:
+            return
+        table = _sorted(pq.read_table([path for _, _, path in parts], schema=_schema()))
+        # The merged part covers every merged range, so until the old files
+        # are removed queries treat them as superseded
+        self._write_part(month, min(p[0] for p in parts), max(p[1] for p in parts), table)
+        for _, _, path in parts:
+            os.remove(path)
+
+    def start_compactor(self, interval: float = 60.0) -> None:
+        """Compact in a daemon thread every `interval` seconds"""
+        if self._thread is not None:
+            return
+        self._thread = threading.Thread(target=self._compaction_loop, args=(interval,),
+                                        name="standup-compactor", daemon=True)
+        self._thread.start()
+
+    def _compaction_loop(self, interval: float) -> None:
+        while not self._stop.wait(interval):
+            try:
+                self.compact()
+            except Exception:
+                pass
+
+    def stop(self) -> None:
+        self._stop.set()
+
+    # Queries
+
+    def _filter(self, start: Optional[datetime], end: Optional[datetime],
+                student_ids: Optional[List[str]]):
+        expression = None
+        conditions = []
+        if start is not None:
+            conditions.append(ds.field("Date") >= pa.scalar(start, pa.timestamp("us")))
+        if end is not None:
+            conditions.append(ds.field("Date") < pa.scalar(end, pa.timestamp("us")))
+        if student_ids is not None:
+            conditions.append(ds.field("Student ID").isin(list(student_ids)))
+        for condition in conditions:
+            expression = condition if expression is None else expression & condition
+        return expression
+
+    def _months_between(self, start: Optional[datetime], end: Optional[datetime]) -> List[str]:
+        dated = start is not None or end is not None
+        low = _month_key(start) if start is not None else ""
+        high = _month_key(end) if end is not None else "9999-99"
+        return [month for month in self.months()
+                if (month != UNDATED and low <= month <= high) or (month == UNDATED and not dated)]
+
+    def query(self, start=None, end=None, student_ids: Optional[Iterable[str]] = None,
+              columns: Optional[List[str]] = None):
+        """Standups with start <= Date < end for the given students, as a pyarrow Table.
+
+        start and end are dates or datetimes; None leaves that side open.
+        Only month partitions overlapping the range are opened.
+        """
+        if isinstance(start, date) and not isinstance(start, datetime):
+            start = datetime.combine(start, datetime.min.time())
+        if isinstance(end, date) and not isinstance(end, datetime):
+            end = datetime.combine(end, datetime.min.time())
+        if student_ids is not None:
+            student_ids = [str(student_id) for student_id in student_ids]
+        columns = list(columns) if columns is not None else list(COLUMNS)
+        schema = _schema()
+        expression = self._filter(start, end, student_ids)
+
+        for attempt in range(3):
+            through = self.archived_through()
+            paths = [path for month in self._months_between(start, end)
+                     for _, _, path in sorted(self._parts(month, through))]
+            try:
+                archived = pq.read_table(paths, columns=columns, filters=expression, schema=schema,
+                                         memory_map=True) if paths else None
+            except FileNotFoundError:
+                # A merge replaced the parts while they were being listed
+                continue
+            if self.archived_through() == through:
+                break
+        else:
+            raise RuntimeError("Standup archive kept changing while being read")
+
+        # Records appended since the last compaction come from the log
+        recent = _to_table(list(self.store.iter_range(through, self.store.count())))
+        if expression is not None:
+            recent = recent.filter(expression)
+        recent = recent.select(columns)
+        if archived is None:
+            return recent
+        return pa.concat_tables([archived, recent])
+
+    def query_frame(self, start=None, end=None, student_ids: Optional[Iterable[str]] = None,
+                    columns: Optional[List[str]] = None):
+        """query() as a DataFrame sorted newest first"""
+        frame = self.query(start, end, student_ids, columns).to_pandas()
+        if "Date" in frame.columns:
+            frame = frame.sort_values("Date", ascending=False, kind="stable").reset_index(drop=True)
+        return frame
+
+
+if __name__ == "__main__":
+    # python standup_archive.py [log_csv] [archive_dir]
+    import sys
+    log_file = sys.argv[1] if len(sys.argv) > 1 else "developer_standup.csv"
+    archive_dir = sys.argv[2] if len(sys.argv) > 2 else DEFAULT_ARCHIVE_DIR
+    added = StandupArchive(StandupStore(log_file), archive_dir).compact()
+    print(f"Archived {added} standups from {log_file} into {archive_dir}/")
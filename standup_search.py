@@ -0,0 +1,210 @@
+import math
+import re
+import threading
+from array import array
+from datetime import date, datetime
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+
+from standup_store import StandupStore, parse_date
+
+# Full-text search over standups
+#
+# An in-memory inverted index over the "Tasks Done" and "What Learned"
+# fields of the append log. Documents are log record numbers, so postings
+# only ever grow at the end: each term keeps two int32 arrays (document ids
+# in ascending order and term frequencies) that NumPy reads without copying
+# when scoring. Per-document lengths, Student IDs and dates sit in parallel
+# arrays for BM25 normalisation and filtering.
+#
+# Query syntax: bare words are ranked with BM25; "quoted phrases" must also
+# appear verbatim within one field. Phrase candidates are checked against
+# the stored text lazily, best score first, until enough results are found.
+#
+# refresh() indexes records appended since the last call, so a submitted
+# standup is searchable on the next query.
+
+FIELDS = ("Tasks Done", "What Learned")
+TOKEN_PATTERN = re.compile(r"[a-z0-9]+(?:[.+#][a-z0-9]+)*")
+PHRASE_PATTERN = re.compile(r'"([^"]*)"')
+BM25_K1 = 1.2
+BM25_B = 0.75
+_SUFFIXES = ("ations", "ation", "ings", "ing", "ies", "ed", "es", "ly", "s")
+
+
+@lru_cache(maxsize=65536)
+def stem(token: str) -> str:
+    """Light suffix stripping so "deploying", "deployed" and "deploys" match"""
+    for suffix in _SUFFIXES:
+        if token.endswith(suffix) and len(token) - len(suffix) >= 3:
+            if suffix == "ies":
+                return token[:-3] + "y"
+            return token[:-len(suffix)]
+    return token
+
+
+def tokenize(text: str, stemming: bool = True) -> List[str]:
+    tokens = TOKEN_PATTERN.findall((text or "").lower())
+    return [stem(token) for token in tokens] if stemming else tokens
+
+
+def parse_query(query: str, stemming: bool = True) -> Tuple[List[str], List[List[str]]]:
+    """(terms, phrases) of a query; phrase terms count towards the ranking too"""
+    phrases = [tokenize(phrase, stemming) for phrase in PHRASE_PATTERN.findall(query)]
+    phrases = [phrase for phrase in phrases if phrase]
+    terms = tokenize(PHRASE_PATTERN.sub(" ", query), stemming)
+    for phrase in phrases:
+        terms.extend(phrase)
+    return list(dict.fromkeys(terms)), phrases
+
+
+def _contains(tokens: List[str], phrase: List[str]) -> bool:
+    width = len(phrase)
+    return any(tokens[i:i + width] == phrase for i in range(len(tokens) - width + 1))
+
+
+def _epoch(value) -> Optional[float]:
+    if value is None:
+        return None
+    if isinstance(value, date) and not isinstance(value, datetime):
+        value = datetime.combine(value, datetime.min.time())
+    return value.timestamp()
+
+
+class StandupSearchIndex:
+    def __init__(self, store: StandupStore, stemming: bool = True):
+        self.store = store
+        self.stemming = stemming
+        self._lock = threading.Lock()
+        self._reset()
+
+    def _reset(self) -> None:
+        self._postings: Dict[str, Tuple[array, array]] = {}
+        self._lengths = array("i")
+        self._students = array("i")
+        self._dates = array("d")
+        self._student_ids: Dict[str, int] = {}
+        self._total_length = 0
+
+    @property
+    def size(self) -> int:
+        return len(self._lengths)
+
+    def refresh(self) -> int:
+        """Index records appended to the log since the last refresh"""
+        with self._lock:
+            count = self.store.count()
+            if count < self.size:
+                # The log was replaced; start over
+                self._reset()
+            start = self.size
+            for doc_id, record in enumerate(self.store.iter_range(start, count), start):
+                self._add(doc_id, record)
+            return count - start
+
+    def _add(self, doc_id: int, record: Dict) -> None:
+        frequencies: Dict[str, int] = {}
+        length = 0
+        for field in FIELDS:
+            for token in tokenize(record.get(field), self.stemming):
+                frequencies[token] = frequencies.get(token, 0) + 1
+                length += 1
+        for token, frequency in frequencies.items():
+            postings = self._postings.get(token)
+            if postings is None:
+                postings = self._postings[token] = (array("i"), array("i"))
+            postings[0].append(doc_id)
+            postings[1].append(frequency)
+        self._lengths.append(length)
+        self._total_length += length
+        student = record.get("Student ID") or ""
+        self._students.append(self._student_ids.setdefault(student, len(self._student_ids)))
+        parsed = parse_date(record.get("Date"))
+        self._dates.append(parsed.timestamp() if parsed is not None else math.nan)
+
+    def _allowed(self, doc_ids: np.ndarray, student_ids: Optional[Iterable[str]],
+                 start: Optional[float], end: Optional[float]) -> np.ndarray:
+        mask = np.ones(len(doc_ids), dtype=bool)
+        if student_ids is not None:
+            wanted = [self._student_ids[s] for s in student_ids if s in self._student_ids]
+            students = np.frombuffer(self._students, dtype=np.int32)
+            mask &= np.isin(students[doc_ids], wanted)
+        if start is not None or end is not None:
+            dates = np.frombuffer(self._dates, dtype=np.float64)[doc_ids]
+            if start is not None:
+                mask &= dates >= start
+            if end is not None:
+                mask &= dates < end
+        return mask
+
+    def search(self, query: str, student_ids: Optional[Iterable[str]] = None,
+               start=None, end=None, limit: int = 20) -> List[Dict]:
+        """Best matching standups, each with its record number and score.
+
+        start and end (dates or datetimes) bound the Date column as
+        start <= Date < end.
+        """
+        self.refresh()
+        terms, phrases = parse_query(query, self.stemming)
+        if not terms:
+            return []
+        if student_ids is not None:
+            student_ids = [str(student_id) for student_id in student_ids]
+        with self._lock:
+            doc_ids, scores = self._score(terms, phrases, student_ids, _epoch(start), _epoch(end))
+        order = np.argsort(-scores, kind="stable")
+        results = []
+        # Fetch the stored text a batch at a time; without phrases the first
+        # batch is the answer
+        batch = limit * 4 if phrases else limit
+        for chunk_start in range(0, len(order), batch):
+            chunk = order[chunk_start:chunk_start + batch]
+            records = self.store.read_records(int(doc_ids[position]) for position in chunk)
+            for position, record in zip(chunk, records):
+                if record is None or (phrases and not self._has_phrases(record, phrases)):
+                    continue
+                results.append(dict(record, record=int(doc_ids[position]),
+                                    score=round(float(scores[position]), 3)))
+                if len(results) >= limit:
+                    return results
+        return results
+
+    def _score(self, terms: List[str], phrases: List[List[str]], student_ids, start, end):
+        empty = np.empty(0, dtype=np.int32), np.empty(0)
+        documents = self.size
+        if not documents:
+            return empty
+        lengths = np.frombuffer(self._lengths, dtype=np.int32)
+        average_length = self._total_length / documents or 1.0
+
+        # Documents holding every phrase term are the only phrase candidates
+        required = None
+        for term in {term for phrase in phrases for term in phrase}:
+            postings = self._postings.get(term)
+            if postings is None:
+                return empty
+            ids = np.frombuffer(postings[0], dtype=np.int32)
+            required = ids if required is None else np.intersect1d(required, ids, assume_unique=True)
+
+        # Accumulate BM25 contributions into one dense array over all documents
+        totals = np.zeros(documents)
+        for term in terms:
+            postings = self._postings.get(term)
+            if postings is None:
+                continue
+            ids = np.frombuffer(postings[0], dtype=np.int32)
+            frequencies = np.frombuffer(postings[1], dtype=np.int32).astype(np.float64)
+            idf = math.log(1 + (documents - len(ids) + 0.5) / (len(ids) + 0.5))
+            norm = BM25_K1 * (1 - BM25_B + BM25_B * lengths[ids] / average_length)
+            totals += np.bincount(ids, weights=idf * frequencies * (BM25_K1 + 1) / (frequencies + norm),
+                                  minlength=documents)
+
+        doc_ids = np.flatnonzero(totals) if required is None else required[totals[required] > 0]
+        doc_ids = doc_ids[self._allowed(doc_ids, student_ids, start, end)]
+        return doc_ids, totals[doc_ids]
+
+    def _has_phrases(self, record: Dict, phrases: List[List[str]]) -> bool:
+        fields = [tokenize(record.get(field), self.stemming) for field in FIELDS]
+        return all(any(_contains(tokens, phrase) for tokens in fields) for phrase in phrases)
@@ -0,0 +1,231 @@
+import csv
+import io
+import os
+import struct
+from datetime import datetime
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+from storage import FileLock
+
+# Append-only standup storage
+#
+# developer_standup.csv keeps its format (a header plus one CSV record per
+# standup, which may span lines when a text area holds newlines). Submitting
+# appends a single record under a file lock and fsyncs it; nothing is ever
+# rewritten. A sidecar index, .developer_standup.csv.idx, holds the byte
+# offset where the header ends followed by the end offset of every record as
+# little-endian int64s, so record i lives at [end[i-1], end[i]) and the last
+# N records or any page of them can be read with two seeks.
+#
+# The index is checked against the file size on every read. Records appended
+# by something that did not update the index are indexed from the last known
+# offset, and a file that shrank or was replaced gets its index rebuilt. A
+# last record that only lacks its newline (hand-edited or older files) gets
+# the newline added; a torn one, cut off inside a quoted field by a crash
+# mid-append, is left out of the index and only truncated by the next append.
+
+COLUMNS = ["Date", "Student ID", "Tasks Done", "What Learned"]
+DATE_FORMATS = ("%Y-%m-%d %H:%M", "%Y-%m-%d %H:%M:%S", "%Y-%m-%d")
+
+_OFFSET = struct.Struct("<q")
+
+
+def parse_date(value: str) -> Optional[datetime]:
+    """The Date column as a datetime, or None if it is not a recognised format"""
+    try:
+        return datetime.fromisoformat(value).replace(tzinfo=None)
+    except (TypeError, ValueError):
+        pass
+    for fmt in DATE_FORMATS:
+        try:
+            return datetime.strptime(value, fmt)
+        except (TypeError, ValueError):
+            continue
+    return None
+
+
+def _record_ends(data: bytes, base: int) -> Tuple[List[int], int]:
+    """End offsets of the complete CSV records in data, and where the last one ends"""
+    ends = []
+    in_quotes = False
+    pos = 0
+    complete = 0
+    while True:
+        newline = data.find(b"\n", pos)
+        if newline < 0:
+            break
+        # A doubled quote inside a quoted field toggles twice, so parity of
+        # the quote count tells whether this newline is inside a field
+        if data.count(b'"', pos, newline) % 2:
+            in_quotes = not in_quotes
+        pos = newline + 1
+        if not in_quotes:
+            ends.append(base + pos)
+            complete = pos
+    return ends, base + complete
+
+
+class StandupStore:
+    def __init__(self, path: str = "developer_standup.csv", columns: List[str] = COLUMNS):
+        self.path = path
+        self.columns = list(columns)
+        directory, name = os.path.split(path)
+        self.index_path = os.path.join(directory, f".{name}.idx")
+        self._lock_path = os.path.join(directory, f".{name}.lock")
+
+    def _size(self, path: str) -> int:
+        try:
+            return os.path.getsize(path)
+        except FileNotFoundError:
+            return 0
+
+    def _offset(self, f, position: int) -> int:
+        f.seek(position * _OFFSET.size)
+        return _OFFSET.unpack(f.read(_OFFSET.size))[0]
+
+    def _index_state(self) -> Tuple[int, Optional[int]]:
+        """(entries in the index, last indexed offset or None if empty)"""
+        entries = self._size(self.index_path) // _OFFSET.size
+        if not entries:
+            return 0, None
+        with open(self.index_path, "rb") as f:
+            return entries, self._offset(f, entries - 1)
+
+    def _append_offsets(self, offsets: List[int], entries: int) -> None:
+        with open(self.index_path, "ab") as f:
+            # Drop a torn partial entry before appending
+            f.truncate(entries * _OFFSET.size)
+            f.write(b"".join(_OFFSET.pack(offset) for offset in offsets))
+            f.flush()
+            os.fsync(f.fileno())
+
+    def _sync_index(self, truncate_torn: bool = False) -> int:
+        """Bring the index up to date with the file and return its entry count.
+
+        The caller holds the lock. Only append() passes truncate_torn.
+        """
+        size = self._size(self.path)
+        entries, last = self._index_state()
+        if last == size:
+            return entries
+        if last is None or last > size:
+            entries, last = 0, 0
+            open(self.index_path, "wb").close()
+            if size == 0:
+                return 0
+        with open(self.path, "rb") as f:
+            f.seek(last)
+            data = f.read(size - last)
+        ends, complete = _record_ends(data, last)
+        if complete < size:
+            if data.count(b'"', complete - last) % 2 == 0:
+                # Quotes are balanced, so this is a whole record without its newline
+                with open(self.path, "ab") as f:
+                    f.write(b"\n")
+                    f.flush()
+                    os.fsync(f.fileno())
+                ends.append(size + 1)
+            elif truncate_torn:
+                with open(self.path, "r+b") as f:
+                    f.truncate(complete)
+        self._append_offsets(ends, entries)
+        return entries + len(ends)
+
+    def _ensure_index(self) -> int:
+        """Index entry count, syncing the index only if it is behind the file"""
+        entries, last = self._index_state()
+        if last is not None and last == self._size(self.path):
+            return entries
+        with FileLock(self._lock_path):
+            return self._sync_index()
+
+    def rebuild_index(self) -> int:
+        with FileLock(self._lock_path):
+            if os.path.exists(self.index_path):
+                os.remove(self.index_path)
+            return max(self._sync_index() - 1, 0)
+
+    def count(self) -> int:
+        return max(self._ensure_index() - 1, 0)
+
+    def columns_in_file(self) -> List[str]:
+        """Header of the stored file, falling back to the default columns"""
+        if not self._ensure_index():
+            return self.columns
+        with open(self.index_path, "rb") as f:
+            header_end = self._offset(f, 0)
+        with open(self.path, "rb") as f:
+            header = f.read(header_end).decode("utf-8-sig")
+        return next(csv.reader(io.StringIO(header, newline="")), self.columns)
+
+    def append(self, entry: Dict) -> None:
+        """Durably append one standup"""
+        buffer = io.StringIO()
+        writer = csv.writer(buffer, lineterminator="\n")
+        with FileLock(self._lock_path):
+            entries = self._sync_index(truncate_torn=True)
+            columns = self.columns
+            if entries == 0:
+                writer.writerow(columns)
+            else:
+                columns = self.columns_in_file()
+            writer.writerow([entry.get(column, "") for column in columns])
+            payload = buffer.getvalue().encode("utf-8")
+            with open(self.path, "ab") as f:
+                start = f.tell()
+                f.write(payload)
+                f.flush()
+                os.fsync(f.fileno())
+            ends, _ = _record_ends(payload, start)
+            self._append_offsets(ends, entries)
+
+    def read_range(self, start: int, stop: int) -> List[Dict]:
+        """Records [start, stop) in file order"""
+        return list(self.iter_range(start, stop))
+
+    def iter_range(self, start: int, stop: int) -> Iterator[Dict]:
+        start, stop = max(start, 0), min(stop, self.count())
+        if start >= stop:
+            return
+        columns = self.columns_in_file()
+        with open(self.index_path, "rb") as f:
+            # Entry 0 is the end of the header, entry i the end of record i-1
+            begin = self._offset(f, start)
+            end = self._offset(f, stop)
+        with open(self.path, "rb") as f:
+            f.seek(begin)
+            text = f.read(end - begin).decode("utf-8")
+        for row in csv.reader(io.StringIO(text, newline="")):
+            yield dict(zip(columns, row))
+
+    def read_records(self, numbers: Iterable[int]) -> List[Optional[Dict]]:
+        """Records by number in the order given (None if out of range), one seek each"""
+        count = self.count()
+        columns = self.columns_in_file()
+        records = []
+        with open(self.index_path, "rb") as index, open(self.path, "rb") as data:
+            for number in numbers:
+                if not 0 <= number < count:
+                    records.append(None)
+                    continue
+                begin = self._offset(index, number)
+                data.seek(begin)
+                text = data.read(self._offset(index, number + 1) - begin).decode("utf-8")
+                row = next(csv.reader(io.StringIO(text, newline="")), [])
+                records.append(dict(zip(columns, row)))
+        return records
+
+    def tail(self, n: int) -> List[Dict]:
+        """The most recent n standups, newest first"""
+        return self.page(0, n)
+
+    def page(self, number: int, page_size: int) -> List[Dict]:
+        """Page `number` of the history, newest first; page 0 is the latest"""
+        records = self.count()
+        stop = records - number * page_size
+        rows = self.read_range(stop - page_size, stop)
+        rows.reverse()
+        return rows
+
+    def page_count(self, page_size: int) -> int:
+        return max(1, -(-self.count() // page_size))
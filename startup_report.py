@@ -0,0 +1,139 @@
+import argparse
+import json
+import os
+import subprocess
+import sys
+import time
+from typing import Dict, List, Optional, Tuple
+
+# Cold-start report for the Streamlit apps
+#
+#   python startup_report.py                    # login page of Home.py
+#   python startup_report.py --page performance_dashboard
+#   python startup_report.py --script techdev --top 20
+#
+# Two measurements, each in a fresh interpreter so nothing is already
+# imported or cached:
+#   1. `python -X importtime -c "import <module>"`, summarised per top-level
+#      import, i.e. what importing the page module costs by itself
+#   2. the first script run and one rerun under streamlit's AppTest, and which
+#      heavy libraries those runs ended up loading
+
+# streamlit itself imports lazy stubs of plotly.graph_objects and plotly.io,
+# so plotly.express is the marker for the charting stack
+HEAVY_MODULES = ("numpy", "pandas", "plotly.express", "supabase", "pyarrow")
+APP_DIR = os.path.dirname(os.path.abspath(__file__))
+
+
+def parse_importtime(stderr: str) -> List[Tuple[int, str, int, int]]:
+    """(depth, module, self_us, cumulative_us) rows of `-X importtime` output"""
+    rows = []
+    for line in stderr.splitlines():
+        if not line.startswith("import time:") or "imported package" in line:
+            continue
+        fields = line[len("import time:"):].split("|", 2)
+        if len(fields) != 3:
+            continue
+        self_us, cumulative_us, name = fields
+        # One space of padding, then two per nesting level
+        depth = (len(name) - len(name.lstrip()) - 1) // 2
+        try:
+            rows.append((depth, name.strip(), int(self_us), int(cumulative_us)))
+        except ValueError:
+            continue
+    return rows
+
+
+def import_breakdown(module: str) -> Tuple[int, List[Tuple[str, int]]]:
+    """Cumulative import time of a module and of each of its direct imports"""
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", f"import {module}"],
+                            cwd=APP_DIR, capture_output=True, text=True)
+    rows = parse_importtime(result.stderr)
+    total = next((cumulative for depth, name, _, cumulative in rows if depth == 0 and name == module), 0)
+    # Direct imports are printed (depth 1) before the module itself
+    children = []
+    for depth, name, _, cumulative in rows:
+        if depth == 0 and name == module:
+            break
+        if depth == 0:
+            children = []
+        elif depth == 1:
+            children.append((name, cumulative))
+    return total, sorted(children, key=lambda row: row[1], reverse=True)
+
+
+def measure_runs(script: str, page: Optional[str]) -> Dict:
+    """Time the first run and a rerun of a script in this process"""
+    from streamlit.testing.v1 import AppTest
+
+    app = AppTest.from_file(os.path.join(APP_DIR, script), default_timeout=120)
+    if page:
+        app.session_state["logged_in"] = True
+        app.session_state["username"] = "startup-report@example.com"
+        app.session_state["user_role"] = "Tech Lead"
+        app.session_state["tech_lead_verified"] = True
+        app.session_state["current_page"] = page
+    timings = []
+    for _ in range(2):
+        started = time.perf_counter()
+        app.run()
+        timings.append(time.perf_counter() - started)
+    return {
+        "first_run_seconds": round(timings[0], 3),
+        "rerun_seconds": round(timings[1], 3),
+        "exceptions": [str(exception.value) for exception in app.exception],
+        "loaded": [name for name in HEAVY_MODULES if name in sys.modules],
+    }
+
+
+def main(argv: List[str] = None) -> None:
+    parser = argparse.ArgumentParser(description="Cold-start report for the TechDev apps")
+    parser.add_argument("--script", default="Home.py", help="app script to measure")
+    parser.add_argument("--page", default=None,
+                        help="current_page to open as a verified tech lead (default: the login page)")
+    parser.add_argument("--top", type=int, default=15, help="number of imports to list")
+    parser.add_argument("--json", action="store_true", help="print the report as JSON")
+    parser.add_argument("--measure-runs", action="store_true", help=argparse.SUPPRESS)
+    args = parser.parse_args(argv)
+
+    if args.measure_runs:
+        print(json.dumps(measure_runs(args.script, args.page)))
+        return
+
+    module = os.path.splitext(args.script)[0]
+    total, imports = 0, []
+    if args.script.endswith(".py"):
+        total, imports = import_breakdown(module)
+    command = [sys.executable, os.path.abspath(__file__), "--measure-runs", "--script", args.script]
+    if args.page:
+        command += ["--page", args.page]
+    child = subprocess.run(command, cwd=APP_DIR, capture_output=True, text=True)
+    try:
+        runs = json.loads(child.stdout.strip().splitlines()[-1])
+    except (IndexError, ValueError):
+        runs = {"error": child.stderr.strip().splitlines()[-1:] or ["no output"]}
+
+    report = {
+        "script": args.script,
+        "page": args.page or "login",
+        "import_seconds": round(total / 1e6, 3),
+        "imports": [{"module": name, "cumulative_ms": round(cumulative / 1000, 1)}
+                    for name, cumulative in imports[:args.top]],
+        "runs": runs,
+    }
+    if args.json:
+        print(json.dumps(report, indent=2))
+        return
+
+    print(f"{report['script']} ({report['page']} page)")
+    if imports:
+        print(f"\nimport {module}: {report['import_seconds']:.3f}s")
+        for row in report["imports"]:
+            print(f"  {row['cumulative_ms']:>9.1f} ms  {row['module']}")
+    print()
+    for key, value in runs.items():
+        print(f"{key}: {value}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,1248 @@
+import argparse
+import base64
+import json
+import os
+import random
+import sqlite3
+import threading
+import time
+from bisect import bisect_left, bisect_right
+from itertools import islice
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+try:
+    import fcntl
+except ImportError:  # Windows
+    fcntl = None
+    import msvcrt
+
+# Pluggable storage for the team-management data
+#
+# Both backends expose the same documents the apps have always used
+# (users_roles.json, teams.json, tech_leads.json, ...) through load()/save(),
+# plus per-record operations for the hot mutation paths. The JSON backend
+# keeps the existing files; the SQLite backend stores users, teams, team
+# members and tech leads in indexed tables so a role change or a member add
+# is a single-row transaction.
+#
+# Select the backend with TECHDEV_STORAGE=json|sqlite (default json) and the
+# database path with TECHDEV_DB (default techdev.db).
+
+USERS_DOC = "users_roles.json"
+TEAMS_DOC = "teams.json"
+TECH_LEADS_DOC = "tech_leads.json"
+
+MAX_TEAM_SIZE = 5
+
+
+def check_member_add(members: List[Dict], member: Dict) -> None:
+    """Raise ValueError if the member cannot join a team with these members"""
+    if len(members) >= MAX_TEAM_SIZE:
+        raise ValueError(f"Maximum team size reached ({MAX_TEAM_SIZE} members)")
+    wanted = member['gitlab_username'].lower()
+    if any(m['gitlab_username'].lower() == wanted for m in members):
+        raise ValueError("This GitLab username is already in your team!")
+
+
+# Batched member changes
+#
+# A batch is a list of changes, applied in order:
+#   {'op': 'add', 'leader': ..., 'member': {...}}      into the leader's team,
+#                                                      created if it has none
+#   {'op': 'move', 'gitlab_username': ..., 'leader': ...}
+#   {'op': 'remove', 'gitlab_username': ...}
+# plan_member_changes validates the whole batch in one pass over the teams
+# document (team size cap, GitLab usernames unique across all teams, known
+# members) and reports every problem rather than the first. A batch is
+# applied all-or-nothing in a single write: one compare-and-swap of
+# teams.json, or one SQLite transaction.
+
+class MemberBatchError(ValueError):
+    """A member batch failed validation; `errors` holds (change index, message) pairs"""
+
+    def __init__(self, errors: List[Tuple[int, str]]):
+        super().__init__(f"{len(errors)} invalid change(s) in the batch")
+        self.errors = errors
+
+
+def team_id_for(leader: str) -> str:
+    """Id of the team a leader gets on first use"""
+    return f"{leader}_team"
+
+
+def plan_member_changes(teams: Dict, changes: List[Dict], created_at: str) -> Dict:
+    """Validate a batch and apply it to the teams document in place.
+
+    Returns the errors, the row-level operations (for backends that do not
+    write the whole document), the teams created and the change in the
+    team counts. On errors the document is left partly changed and must be
+    discarded.
+    """
+    by_leader: Dict[str, str] = {}
+    by_gitlab: Dict[str, str] = {}
+    for team_id, team in teams.items():
+        by_leader.setdefault(team.get('leader'), team_id)
+        for member in team.get('members', []):
+            by_gitlab.setdefault(member['gitlab_username'].lower(), team_id)
+    errors: List[Tuple[int, str]] = []
+    operations: List[Tuple] = []
+    created: List[Tuple[str, str]] = []
+    sizes_before: Dict[str, int] = {}
+
+    def touch(team_id):
+        if team_id not in sizes_before:
+            sizes_before[team_id] = len(teams[team_id]['members']) if team_id in teams else 0
+
+    def take(team_id, gitlab_username):
+        members = teams[team_id]['members']
+        for position, member in enumerate(members):
+            if member['gitlab_username'].lower() == gitlab_username:
+                del members[position]
+                del by_gitlab[gitlab_username]
+                return member
+
+    for index, change in enumerate(changes):
+        op = change.get('op')
+        if op == 'add':
+            member = change.get('member') or {}
+            leader = change.get('leader')
+            name, gitlab_username = member.get('name'), member.get('gitlab_username')
+            if not leader or not name or not gitlab_username:
+                errors.append((index, "Leader, name and GitLab username are required"))
+                continue
+            wanted = gitlab_username.lower()
+            team_id = by_leader.get(leader, team_id_for(leader))
+            if wanted in by_gitlab:
+                where = "this team" if by_gitlab[wanted] == team_id else f"team {by_gitlab[wanted]}"
+                errors.append((index, f"@{gitlab_username} is already a member of {where}"))
+                continue
+            if len(teams[team_id]['members'] if team_id in teams else ()) >= MAX_TEAM_SIZE:
+                errors.append((index, f"{leader}'s team is full ({MAX_TEAM_SIZE} members)"))
+                continue
+            touch(team_id)
+            if team_id not in teams:
+                teams[team_id] = {'leader': leader, 'members': [], 'created_at': created_at}
+                by_leader[leader] = team_id
+                created.append((team_id, leader))
+            teams[team_id]['members'].append(member)
+            by_gitlab[wanted] = team_id
+            operations.append(('add', team_id, member))
+        elif op in ('move', 'remove'):
+            gitlab_username = (change.get('gitlab_username') or '').lower()
+            source = by_gitlab.get(gitlab_username)
+            if source is None:
+                errors.append((index, f"@{change.get('gitlab_username')} is not in any team"))
+                continue
+            if op == 'remove':
+                touch(source)
+                member = take(source, gitlab_username)
+                operations.append(('remove', source, member['gitlab_username']))
+                continue
+            leader = change.get('leader')
+            target = by_leader.get(leader)
+            if target is None:
+                errors.append((index, f"{leader or 'The leader'} has no team"))
+            elif target == source:
+                errors.append((index, f"@{change['gitlab_username']} is already in {leader}'s team"))
+            elif len(teams[target]['members']) >= MAX_TEAM_SIZE:
+                errors.append((index, f"{leader}'s team is full ({MAX_TEAM_SIZE} members)"))
+            else:
+                touch(source)
+                touch(target)
+                member = take(source, gitlab_username)
+                teams[target]['members'].append(member)
+                by_gitlab[gitlab_username] = target
+                operations.append(('move', source, target, member['gitlab_username']))
+        else:
+            errors.append((index, f"Unknown operation: {op}"))
+
+    sizes_after = {team_id: len(teams[team_id]['members']) for team_id in sizes_before}
+    return {
+        'errors': errors,
+        'operations': operations,
+        'created': created,
+        'sizes': {team_id: (sizes_before[team_id], sizes_after[team_id]) for team_id in sizes_before},
+        'delta': {
+            'total_teams': len(created),
+            'total_team_members': sum(sizes_after.values()) - sum(sizes_before.values()),
+            'active_teams': (sum(1 for size in sizes_after.values() if size)
+                             - sum(1 for size in sizes_before.values() if size)),
+        },
+    }
+
+
+def preview_member_changes(storage, changes: List[Dict], created_at: str) -> Dict:
+    """plan_member_changes against the current data, without writing anything"""
+    return plan_member_changes(storage.load(TEAMS_DOC), changes, created_at)
+
+
+# Team queries
+#
+# iter_teams() streams team summaries (team_id, leader, created_at and
+# member_count, without the member lists) that match the filters, in sort
+# order, starting after a cursor. A cursor is the sort key of the last team
+# on the previous page, so any page costs a seek plus the rows it shows, and
+# pages do not shift when teams are added before them. team_members() loads
+# one team's members when a page expands it.
+
+TEAM_SORTS = ("created_at", "leader", "member_count", "team_id")
+
+
+def team_sort_key(summary: Dict, sort: str) -> tuple:
+    value = summary[sort]
+    return (value if value is not None else '', summary['team_id'])
+
+
+def team_matches(summary: Dict, leader: str = None, min_members: int = None, max_members: int = None,
+                 created_since: str = None, created_before: str = None) -> bool:
+    """Whether a summary passes the iter_teams filters (created_* are ISO strings)"""
+    if leader is not None and summary['leader'] != leader:
+        return False
+    if min_members is not None and summary['member_count'] < min_members:
+        return False
+    if max_members is not None and summary['member_count'] > max_members:
+        return False
+    created_at = summary['created_at'] or ''
+    if created_since is not None and created_at < created_since:
+        return False
+    if created_before is not None and created_at >= created_before:
+        return False
+    return True
+
+
+def encode_cursor(summary: Dict, sort: str) -> str:
+    """Opaque cursor that resumes a query after this team"""
+    return base64.urlsafe_b64encode(json.dumps(team_sort_key(summary, sort)).encode()).decode()
+
+
+def decode_cursor(cursor: Optional[str]) -> Optional[tuple]:
+    if not cursor:
+        return None
+    try:
+        value, team_id = json.loads(base64.urlsafe_b64decode(cursor.encode()))
+    except (ValueError, TypeError):
+        raise ValueError("Invalid cursor")
+    return (value, team_id)
+
+
+def page_teams(storage, limit: int = 25, cursor: str = None, **query) -> Tuple[List[Dict], Optional[str]]:
+    """One page of iter_teams and the cursor of the next page (None on the last)"""
+    teams = storage.iter_teams(after=decode_cursor(cursor), **query)
+    try:
+        rows = list(islice(teams, limit + 1))
+    finally:
+        teams.close()
+    if len(rows) <= limit:
+        return rows, None
+    return rows[:limit], encode_cursor(rows[limit - 1], query.get('sort', 'created_at'))
+
+
+# Platform statistics
+#
+# Counts behind get_platform_stats and the health score, kept up to date by
+# the mutation paths instead of being recomputed from full scans. They are
+# stored alongside the data (platform_stats.json, or a table in SQLite) and
+# can be checked against a full rebuild with `python storage.py stats`.
+# JsonStorage commits a document and its stats in two writes, so it tags each
+# document's counts with the document version they reflect: a delta or
+# recount older than that is dropped, and a missing step (a concurrent write
+# still on its way, or a process that died between the writes) is repaired by
+# recounting the document.
+
+STATS_DOC = "platform_stats.json"
+STATS_VERSIONS = "_versions"
+STAT_FIELDS = ("total_users", "users_with_role", "developer_interns", "tech_leads",
+               "total_teams", "active_teams", "total_team_members")
+DOC_STAT_FIELDS = {
+    USERS_DOC: ("total_users", "users_with_role", "developer_interns"),
+    TECH_LEADS_DOC: ("tech_leads",),
+    TEAMS_DOC: ("total_teams", "active_teams", "total_team_members"),
+}
+
+
+def compute_doc_stats(doc: str, data: Dict) -> Dict[str, int]:
+    """Full-scan counts contributed by one document"""
+    if doc == USERS_DOC:
+        return {
+            'total_users': len(data),
+            'users_with_role': sum(1 for u in data.values() if u.get('role')),
+            'developer_interns': sum(1 for u in data.values() if u.get('role') == 'Developer Intern'),
+        }
+    if doc == TECH_LEADS_DOC:
+        return {'tech_leads': len(data)}
+    if doc == TEAMS_DOC:
+        return {
+            'total_teams': len(data),
+            'active_teams': sum(1 for t in data.values() if len(t.get('members', [])) > 0),
+            'total_team_members': sum(len(t.get('members', [])) for t in data.values()),
+        }
+    return {}
+
+
+def health_score(stats: Dict[str, int]) -> float:
+    """Overall platform health score (0-100) from the platform counts"""
+    score = 0
+    total_users = stats.get('total_users', 0)
+    total_teams = stats.get('total_teams', 0)
+
+    # User engagement (30%)
+    if total_users > 0:
+        score += (stats.get('users_with_role', 0) / total_users) * 30
+
+    # Team formation (40%)
+    if total_teams > 0:
+        score += (stats.get('active_teams', 0) / total_teams) * 40
+
+    # Leadership presence (30%)
+    if total_users > 0:
+        score += min((stats.get('tech_leads', 0) / total_users) * 30, 30)
+
+    return min(round(score, 1), 100)
+
+
+def _role_delta(old_role: Optional[str], new_role: Optional[str], is_new_user: bool) -> Dict[str, int]:
+    return {
+        'total_users': int(is_new_user),
+        'users_with_role': int(bool(new_role)) - int(bool(old_role)),
+        'developer_interns': int(new_role == 'Developer Intern') - int(old_role == 'Developer Intern'),
+    }
+
+
+# Secondary indexes
+#
+# role -> usernames, leader -> team ids and lowercase GitLab username ->
+# (team id, member), so the lookups the pages make do not scan whole
+# documents. SQLite answers them from its table indexes. JsonStorage keeps
+# them in memory, tagged with the signature of the document they were built
+# from: its own writes hand over the data they committed, and a change made
+# by another process is picked up by the signature check on the next lookup.
+
+INDEXED_DOCS = (USERS_DOC, TEAMS_DOC)
+
+
+def build_indexes(doc: str, data: Dict) -> Dict[str, Dict]:
+    """Secondary indexes over one document"""
+    if doc == USERS_DOC:
+        by_role: Dict[Optional[str], List[str]] = {}
+        for username, user in data.items():
+            by_role.setdefault(user.get('role'), []).append(username)
+        return {'users': data, 'users_by_role': by_role}
+    if doc == TEAMS_DOC:
+        by_leader: Dict[str, List[str]] = {}
+        by_gitlab: Dict[str, Tuple[str, Dict]] = {}
+        for team_id, team in data.items():
+            by_leader.setdefault(team.get('leader'), []).append(team_id)
+            for member in team.get('members', []):
+                by_gitlab.setdefault(member['gitlab_username'].lower(), (team_id, member))
+        # Summaries and sort orders for iter_teams are added on first use
+        return {'teams': data, 'teams_by_leader': by_leader, 'member_by_gitlab': by_gitlab,
+                'team_queries': {'teams': data}}
+    return {}
+
+
+class ConflictError(RuntimeError):
+    """A read-modify-write kept losing the compare-and-swap race"""
+
+
+class FileLock:
+    """Exclusive advisory lock on a file, across threads and processes"""
+
+    _thread_locks: Dict[str, threading.Lock] = {}
+    _guard = threading.Lock()
+
+    def __init__(self, path: str):
+        self.path = path
+        with self._guard:
+            self._thread_lock = self._thread_locks.setdefault(path, threading.Lock())
+
+    def __enter__(self):
+        self._thread_lock.acquire()
+        self._file = open(self.path, "a+")
+        if fcntl is not None:
+            fcntl.flock(self._file.fileno(), fcntl.LOCK_EX)
+        else:
+            self._file.seek(0)
+            msvcrt.locking(self._file.fileno(), msvcrt.LK_LOCK, 1)
+        return self
+
+    def __exit__(self, *exc):
+        try:
+            if fcntl is not None:
+                fcntl.flock(self._file.fileno(), fcntl.LOCK_UN)
+            else:
+                self._file.seek(0)
+                msvcrt.locking(self._file.fileno(), msvcrt.LK_UNLCK, 1)
+        finally:
+            self._file.close()
+            self._thread_lock.release()
+
+
+def _retry_delay(attempt: int) -> float:
+    return random.uniform(0, min(0.05, 0.001 * (2 ** attempt)))
+
+
+class JsonStorage:
+    """Whole-file JSON documents in a directory.
+
+    Writes go to a temporary file that is renamed over the document, so
+    readers never see a truncated file. Each document has a version counter
+    in a hidden sidecar file; update() runs a read-modify-write closure and
+    commits it with compare-and-swap on that version, retrying on conflict.
+    The per-document lock is only held for the compare and the rename.
+    """
+
+    name = "json"
+
+    def __init__(self, directory: str = ".", max_retries: int = 50):
+        self.directory = directory
+        self.max_retries = max_retries
+        self.conflicts = 0
+        # doc -> (signature, data, indexes or None until first lookup)
+        self._indexes: Dict[str, Tuple[Optional[tuple], Dict, Optional[Dict]]] = {}
+        self._index_lock = threading.Lock()
+
+    def path(self, doc: str) -> str:
+        return os.path.join(self.directory, doc)
+
+    def _version_path(self, doc: str) -> str:
+        return os.path.join(self.directory, f".{doc}.version")
+
+    def _lock(self, doc: str) -> FileLock:
+        return FileLock(os.path.join(self.directory, f".{doc}.lock"))
+
+    def version(self, doc: str) -> int:
+        try:
+            with open(self._version_path(doc), 'r') as f:
+                return int(f.read() or 0)
+        except (FileNotFoundError, ValueError):
+            return 0
+
+    def signature(self, doc: str) -> Optional[tuple]:
+        """Changes whenever the document changes; None if it does not exist"""
+        try:
+            stat = os.stat(self.path(doc))
+        except FileNotFoundError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
+    def load(self, doc: str) -> Dict:
+        path = self.path(doc)
+        if not os.path.exists(path):
+            return {}
+        with open(path, 'r') as f:
+            return json.load(f)
+
+    def load_versioned(self, doc: str) -> Tuple[int, Dict]:
+        """A document together with the version it was read at"""
+        while True:
+            before = self.version(doc)
+            data = self.load(doc)
+            if self.version(doc) == before:
+                return before, data
+
+    def _replace(self, path: str, text: str) -> None:
+        tmp_path = f"{path}.{os.getpid()}.{threading.get_ident()}.tmp"
+        with open(tmp_path, 'w') as f:
+            f.write(text)
+            f.flush()
+            os.fsync(f.fileno())
+        os.replace(tmp_path, path)
+
+    def _write(self, doc: str, data: Dict, version: int) -> None:
+        # Data first, then version: a reader that sees the new data with the
+        # old version can only fail its compare-and-swap, never win it
+        self._replace(self.path(doc), json.dumps(data, indent=2))
+        self._replace(self._version_path(doc), str(version + 1))
+
+    def compare_and_swap(self, doc: str, expected_version: int, data: Dict) -> bool:
+        return self._compare_and_swap(doc, expected_version, data) is not None
+
+    def _compare_and_swap(self, doc: str, expected_version: int, data: Dict) -> Optional[tuple]:
+        """Signature of the committed document, or None if the version moved"""
+        with self._lock(doc):
+            current = self.version(doc)
+            if current != expected_version:
+                return None
+            self._write(doc, data, current)
+            return self.signature(doc)
+
+    def save(self, doc: str, data: Dict) -> None:
+        """Unconditionally replace a document"""
+        with self._lock(doc):
+            version = self.version(doc)
+            self._write(doc, data, version)
+        self._refresh_doc_stats(doc, version + 1, data)
+
+    def update(self, doc: str, mutate: Callable[[Dict], Any]) -> Any:
+        """Apply `mutate` to a fresh copy of the document until it commits.
+
+        `mutate` changes the dict in place and may return a value, which is
+        passed through. It may run several times, so it must not have side
+        effects outside the document. Exceptions it raises abort the update.
+        """
+        result, data, version = self._update(doc, mutate)
+        self._refresh_doc_stats(doc, version, data)
+        return result
+
+    def _update(self, doc: str, mutate: Callable[[Dict], Any]) -> Tuple[Any, Dict, int]:
+        """(result, committed data, committed version)"""
+        for attempt in range(self.max_retries):
+            version, data = self.load_versioned(doc)
+            result = mutate(data)
+            signature = self._compare_and_swap(doc, version, data)
+            if signature is not None:
+                self._remember(doc, signature, data)
+                return result, data, version + 1
+            self.conflicts += 1
+            time.sleep(_retry_delay(attempt))
+        raise ConflictError(f"Gave up updating {doc} after {self.max_retries} conflicts")
+
+    def _remember(self, doc: str, signature: tuple, data: Dict) -> None:
+        """Adopt data this instance just committed as the source of its indexes"""
+        if doc in INDEXED_DOCS:
+            with self._index_lock:
+                self._indexes[doc] = (signature, data, None)
+
+    def _index(self, doc: str, name: str) -> Dict:
+        signature = self.signature(doc)
+        with self._index_lock:
+            cached = self._indexes.get(doc)
+            if cached is not None and cached[0] == signature:
+                _, data, indexes = cached
+                if indexes is None:
+                    indexes = build_indexes(doc, data)
+                    self._indexes[doc] = (signature, data, indexes)
+                return indexes[name]
+        # Changed elsewhere (or never read): the signature was taken before
+        # the load, so a write racing with it only causes another rebuild
+        data = self.load(doc)
+        indexes = build_indexes(doc, data)
+        with self._index_lock:
+            self._indexes[doc] = (signature, data, indexes)
+        return indexes[name]
+
+    def has_user(self, username: str) -> bool:
+        return username in self._index(USERS_DOC, 'users')
+
+    def users_by_role(self, role: Optional[str]) -> List[str]:
+        return list(self._index(USERS_DOC, 'users_by_role').get(role, ()))
+
+    def teams_by_leader(self, leader: str) -> List[str]:
+        return list(self._index(TEAMS_DOC, 'teams_by_leader').get(leader, ()))
+
+    def find_member(self, gitlab_username: str) -> Optional[Tuple[str, Dict]]:
+        """(team_id, member) holding a GitLab username, case-insensitively"""
+        found = self._index(TEAMS_DOC, 'member_by_gitlab').get(gitlab_username.lower())
+        return None if found is None else (found[0], dict(found[1]))
+
+    def iter_teams(self, leader: str = None, min_members: int = None, max_members: int = None,
+                   created_since: str = None, created_before: str = None, sort: str = "created_at",
+                   descending: bool = False, after: tuple = None) -> Iterator[Dict]:
+        """Team summaries matching the filters, in sort order, after the `after` key"""
+        if sort not in TEAM_SORTS:
+            raise ValueError(f"Unknown sort: {sort}")
+        # Built once per version of the document; concurrent builders
+        # compute the same values, so the race is harmless
+        queries = self._index(TEAMS_DOC, 'team_queries')
+        summaries = queries.get('summaries')
+        if summaries is None:
+            summaries = queries['summaries'] = {
+                team_id: {'team_id': team_id, 'leader': team.get('leader'), 'created_at': team.get('created_at'),
+                          'member_count': len(team.get('members', []))}
+                for team_id, team in queries['teams'].items()
+            }
+        if leader is not None:
+            candidates = [summaries[team_id] for team_id in self.teams_by_leader(leader) if team_id in summaries]
+            order = sorted(((team_sort_key(summary, sort), summary) for summary in candidates),
+                           key=lambda item: item[0])
+            keys, ordered = [key for key, _ in order], [summary for _, summary in order]
+        else:
+            order = queries.get(sort)
+            if order is None:
+                order = sorted(((team_sort_key(summary, sort), summary) for summary in summaries.values()),
+                               key=lambda item: item[0])
+                order = queries[sort] = ([key for key, _ in order], [summary for _, summary in order])
+            keys, ordered = order
+        if descending:
+            stop = len(keys) if after is None else bisect_left(keys, tuple(after))
+            positions = range(stop - 1, -1, -1)
+        else:
+            start = 0 if after is None else bisect_right(keys, tuple(after))
+            positions = range(start, len(keys))
+        for position in positions:
+            summary = ordered[position]
+            if team_matches(summary, leader, min_members, max_members, created_since, created_before):
+                yield dict(summary)
+
+    def team_members(self, team_id: str) -> List[Dict]:
+        team = self._index(TEAMS_DOC, 'teams').get(team_id)
+        return [] if team is None else [dict(member) for member in team.get('members', [])]
+
+    def platform_stats(self) -> Dict[str, int]:
+        """Maintained platform counts, rebuilt if they were never stored"""
+        stats = self.load(STATS_DOC)
+        if not all(field in stats for field in STAT_FIELDS):
+            return self.rebuild_stats()
+        # A document ahead of its counts lost (or has not yet made) its stats update
+        versions = stats.get(STATS_VERSIONS, {})
+        for doc in DOC_STAT_FIELDS:
+            if versions.get(doc, -1) < self.version(doc):
+                stats = self._recount_doc_stats(doc)
+        return {field: stats[field] for field in STAT_FIELDS}
+
+    def rebuild_stats(self) -> Dict[str, int]:
+        """Recompute the platform counts from the documents and store them"""
+        for doc in DOC_STAT_FIELDS:
+            stats = self._recount_doc_stats(doc)
+        return {field: stats[field] for field in STAT_FIELDS}
+
+    @staticmethod
+    def _set_doc_stats(stats: Dict, doc: str, version: int, data: Dict) -> None:
+        """Replace a document's share with counts of `data`, unless newer ones are stored"""
+        versions = stats.setdefault(STATS_VERSIONS, {})
+        if versions.get(doc, -1) < version:
+            stats.update(compute_doc_stats(doc, data))
+            versions[doc] = version
+
+    def _recount_doc_stats(self, doc: str) -> Dict:
+        def mutate(stats):
+            self._set_doc_stats(stats, doc, *self.load_versioned(doc))
+        _, stats, _ = self._update(STATS_DOC, mutate)
+        return stats
+
+    def _apply_stats_delta(self, doc: str, version: int, delta: Dict[str, int]) -> None:
+        """Account for the commit that took `doc` to `version`"""
+        def mutate(stats):
+            versions = stats.setdefault(STATS_VERSIONS, {})
+            stored = versions.get(doc, -1)
+            if stored >= version:
+                return
+            if stored == version - 1:
+                for field, change in delta.items():
+                    stats[field] = stats.get(field, 0) + change
+                versions[doc] = version
+            else:
+                self._set_doc_stats(stats, doc, *self.load_versioned(doc))
+        self._update(STATS_DOC, mutate)
+
+    def _refresh_doc_stats(self, doc: str, version: int, data: Dict) -> None:
+        """After a whole-document write, recount that document's share"""
+        if doc not in DOC_STAT_FIELDS:
+            return
+        self._update(STATS_DOC, lambda stats: self._set_doc_stats(stats, doc, version, data))
+
+    def set_user_role(self, username: str, role: str, registered_at: str) -> None:
+        def mutate(users):
+            is_new_user = username not in users
+            user = users.setdefault(username, {})
+            old_role = user.get('role')
+            user['role'] = role
+            user['registered_at'] = registered_at
+            return _role_delta(old_role, role, is_new_user)
+        delta, _, version = self._update(USERS_DOC, mutate)
+        self._apply_stats_delta(USERS_DOC, version, delta)
+
+    def register_tech_lead(self, username: str, record: Dict) -> None:
+        def mutate(tech_leads):
+            is_new = username not in tech_leads
+            tech_leads[username] = record
+            return {'tech_leads': int(is_new)}
+        delta, _, version = self._update(TECH_LEADS_DOC, mutate)
+        self._apply_stats_delta(TECH_LEADS_DOC, version, delta)
+
+    def ensure_team(self, team_id: str, leader: str, created_at: str) -> Dict:
+        """Return the team, creating it empty if it does not exist yet"""
+        teams = self.load(TEAMS_DOC)
+        if team_id in teams:
+            return teams[team_id]
+
+        def mutate(teams):
+            is_new = team_id not in teams
+            teams.setdefault(team_id, {'leader': leader, 'members': [], 'created_at': created_at})
+            return teams[team_id], {'total_teams': int(is_new)}
+        (team, delta), _, version = self._update(TEAMS_DOC, mutate)
+        self._apply_stats_delta(TEAMS_DOC, version, delta)
+        return team
+
+    def add_member(self, team_id: str, member: Dict) -> None:
+        def mutate(teams):
+            members = teams[team_id]['members']
+            check_member_add(members, member)
+            members.append(member)
+            return {'total_team_members': 1, 'active_teams': int(len(members) == 1)}
+        delta, _, version = self._update(TEAMS_DOC, mutate)
+        self._apply_stats_delta(TEAMS_DOC, version, delta)
+
+    def remove_member(self, team_id: str, gitlab_username: str) -> None:
+        wanted = gitlab_username.lower()
+
+        def mutate(teams):
+            members = teams[team_id]['members']
+            remaining = [m for m in members if m['gitlab_username'].lower() != wanted]
+            teams[team_id]['members'] = remaining
+            return {
+                'total_team_members': len(remaining) - len(members),
+                'active_teams': -int(bool(members) and not remaining),
+            }
+        delta, _, version = self._update(TEAMS_DOC, mutate)
+        self._apply_stats_delta(TEAMS_DOC, version, delta)
+
+    def apply_member_changes(self, changes: List[Dict], created_at: str) -> Dict:
+        """Validate and commit a member batch in one write, or raise MemberBatchError"""
+        def mutate(teams):
+            plan = plan_member_changes(teams, changes, created_at)
+            if plan['errors']:
+                raise MemberBatchError(plan['errors'])
+            return plan
+        plan, _, version = self._update(TEAMS_DOC, mutate)
+        self._apply_stats_delta(TEAMS_DOC, version, plan['delta'])
+        return plan
+
+
+# Columns stored natively per table; any other keys round-trip through the
+# `extra` JSON column so nothing in the documents is lost
+USER_COLUMNS = ("role", "registered_at")
+TEAM_COLUMNS = ("leader", "created_at")
+MEMBER_COLUMNS = ("name", "gitlab_username", "added_at")
+TECH_LEAD_COLUMNS = ("token_hash", "registered_at", "status", "permissions")
+
+TABLE_DOCS = {
+    "users": USERS_DOC,
+    "teams": TEAMS_DOC,
+    "team_members": TEAMS_DOC,
+    "tech_leads": TECH_LEADS_DOC,
+}
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS users (
+    username TEXT PRIMARY KEY,
+    role TEXT,
+    registered_at TEXT,
+    extra TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_users_role ON users(role);
+
+CREATE TABLE IF NOT EXISTS teams (
+    team_id TEXT PRIMARY KEY,
+    leader TEXT,
+    created_at TEXT,
+    extra TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_teams_leader ON teams(leader);
+CREATE INDEX IF NOT EXISTS idx_teams_created ON teams(COALESCE(created_at, ''), team_id);
+
+CREATE TABLE IF NOT EXISTS team_members (
+    member_id INTEGER PRIMARY KEY AUTOINCREMENT,
+    team_id TEXT NOT NULL REFERENCES teams(team_id) ON DELETE CASCADE,
+    name TEXT,
+    gitlab_username TEXT,
+    added_at TEXT,
+    extra TEXT
+);
+CREATE INDEX IF NOT EXISTS idx_team_members_team ON team_members(team_id);
+CREATE INDEX IF NOT EXISTS idx_team_members_gitlab ON team_members(lower(gitlab_username));
+
+CREATE TABLE IF NOT EXISTS tech_leads (
+    username TEXT PRIMARY KEY,
+    token_hash TEXT,
+    registered_at TEXT,
+    status TEXT,
+    permissions TEXT,
+    extra TEXT
+);
+
+-- Documents that have no dedicated tables
+CREATE TABLE IF NOT EXISTS documents (
+    name TEXT PRIMARY KEY,
+    body TEXT NOT NULL
+);
+
+-- Maintained platform counts (see STAT_FIELDS), updated by the triggers below
+CREATE TABLE IF NOT EXISTS platform_stats (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL DEFAULT 0
+);
+
+CREATE TRIGGER IF NOT EXISTS stats_users_insert AFTER INSERT ON users BEGIN
+    UPDATE platform_stats SET value = value + 1 WHERE name = 'total_users';
+    UPDATE platform_stats SET value = value + (COALESCE(NEW.role, '') != '') WHERE name = 'users_with_role';
+    UPDATE platform_stats SET value = value + (NEW.role IS 'Developer Intern') WHERE name = 'developer_interns';
+END;
+CREATE TRIGGER IF NOT EXISTS stats_users_update AFTER UPDATE OF role ON users BEGIN
+    UPDATE platform_stats SET value = value + (COALESCE(NEW.role, '') != '') - (COALESCE(OLD.role, '') != '')
+        WHERE name = 'users_with_role';
+    UPDATE platform_stats SET value = value + (NEW.role IS 'Developer Intern') - (OLD.role IS 'Developer Intern')
+        WHERE name = 'developer_interns';
+END;
+CREATE TRIGGER IF NOT EXISTS stats_users_delete AFTER DELETE ON users BEGIN
+    UPDATE platform_stats SET value = value - 1 WHERE name = 'total_users';
+    UPDATE platform_stats SET value = value - (COALESCE(OLD.role, '') != '') WHERE name = 'users_with_role';
+    UPDATE platform_stats SET value = value - (OLD.role IS 'Developer Intern') WHERE name = 'developer_interns';
+END;
+
+CREATE TRIGGER IF NOT EXISTS stats_tech_leads_insert AFTER INSERT ON tech_leads BEGIN
+    UPDATE platform_stats SET value = value + 1 WHERE name = 'tech_leads';
+END;
+CREATE TRIGGER IF NOT EXISTS stats_tech_leads_delete AFTER DELETE ON tech_leads BEGIN
+    UPDATE platform_stats SET value = value - 1 WHERE name = 'tech_leads';
+END;
+
+CREATE TRIGGER IF NOT EXISTS stats_teams_insert AFTER INSERT ON teams BEGIN
+    UPDATE platform_stats SET value = value + 1 WHERE name = 'total_teams';
+END;
+CREATE TRIGGER IF NOT EXISTS stats_teams_delete AFTER DELETE ON teams BEGIN
+    UPDATE platform_stats SET value = value - 1 WHERE name = 'total_teams';
+END;
+
+CREATE TRIGGER IF NOT EXISTS stats_members_insert AFTER INSERT ON team_members BEGIN
+    UPDATE platform_stats SET value = value + 1 WHERE name = 'total_team_members';
+    UPDATE platform_stats SET value = value + 1 WHERE name = 'active_teams'
+        AND (SELECT COUNT(*) FROM team_members WHERE team_id = NEW.team_id) = 1;
+END;
+CREATE TRIGGER IF NOT EXISTS stats_members_delete AFTER DELETE ON team_members BEGIN
+    UPDATE platform_stats SET value = value - 1 WHERE name = 'total_team_members';
+    UPDATE platform_stats SET value = value - 1 WHERE name = 'active_teams'
+        AND NOT EXISTS (SELECT 1 FROM team_members WHERE team_id = OLD.team_id);
+END;
+CREATE TRIGGER IF NOT EXISTS stats_members_move AFTER UPDATE OF team_id ON team_members
+WHEN OLD.team_id IS NOT NEW.team_id BEGIN
+    UPDATE platform_stats SET value = value - 1 WHERE name = 'active_teams'
+        AND NOT EXISTS (SELECT 1 FROM team_members WHERE team_id = OLD.team_id);
+    UPDATE platform_stats SET value = value + 1 WHERE name = 'active_teams'
+        AND (SELECT COUNT(*) FROM team_members WHERE team_id = NEW.team_id) = 1;
+END;
+
+-- One counter per document, bumped by triggers on every change
+CREATE TABLE IF NOT EXISTS doc_versions (
+    name TEXT PRIMARY KEY,
+    version INTEGER NOT NULL DEFAULT 0
+);
+"""
+
+
+def _split(record: Dict, columns: tuple) -> tuple:
+    extra = {key: value for key, value in record.items() if key not in columns}
+    return tuple(record.get(column) for column in columns) + (json.dumps(extra) if extra else None,)
+
+
+def _join(row: sqlite3.Row, columns: tuple) -> Dict:
+    record = {column: row[column] for column in columns if row[column] is not None}
+    if row["extra"]:
+        record.update(json.loads(row["extra"]))
+    return record
+
+
+class SqliteStorage:
+    """Users, teams and tech leads in SQLite (WAL mode)"""
+
+    name = "sqlite"
+
+    def __init__(self, db_path: str = "techdev.db"):
+        self.db_path = db_path
+        self.conflicts = 0
+        self._local = threading.local()
+        with self.connection() as conn:
+            conn.executescript(SCHEMA)
+            for table, doc in TABLE_DOCS.items():
+                conn.execute("INSERT OR IGNORE INTO doc_versions(name) VALUES (?)", (doc,))
+                for event in ("INSERT", "UPDATE", "DELETE"):
+                    conn.execute(
+                        f"CREATE TRIGGER IF NOT EXISTS bump_{table}_{event.lower()} AFTER {event} ON {table} "
+                        f"BEGIN UPDATE doc_versions SET version = version + 1 WHERE name = '{doc}'; END"
+                    )
+            for event in ("INSERT", "UPDATE"):
+                conn.execute(
+                    f"CREATE TRIGGER IF NOT EXISTS bump_documents_{event.lower()} AFTER {event} ON documents "
+                    f"BEGIN INSERT INTO doc_versions(name, version) VALUES (NEW.name, 1) "
+                    f"ON CONFLICT(name) DO UPDATE SET version = version + 1; END"
+                )
+            stored = conn.execute("SELECT COUNT(*) FROM platform_stats").fetchone()[0]
+            if stored != len(STAT_FIELDS):
+                self._rebuild_stats(conn)
+
+    def platform_stats(self) -> Dict[str, int]:
+        """Maintained platform counts; a single indexed read"""
+        rows = self.connection().execute("SELECT name, value FROM platform_stats").fetchall()
+        return {row["name"]: row["value"] for row in rows}
+
+    def rebuild_stats(self) -> Dict[str, int]:
+        """Recompute the platform counts from the tables and store them"""
+        conn = self.connection()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            self._rebuild_stats(conn)
+        return self.platform_stats()
+
+    def _rebuild_stats(self, conn: sqlite3.Connection) -> None:
+        counts = conn.execute("""
+            SELECT
+                (SELECT COUNT(*) FROM users) AS total_users,
+                (SELECT COUNT(*) FROM users WHERE COALESCE(role, '') != '') AS users_with_role,
+                (SELECT COUNT(*) FROM users WHERE role = 'Developer Intern') AS developer_interns,
+                (SELECT COUNT(*) FROM tech_leads) AS tech_leads,
+                (SELECT COUNT(*) FROM teams) AS total_teams,
+                (SELECT COUNT(DISTINCT team_id) FROM team_members) AS active_teams,
+                (SELECT COUNT(*) FROM team_members) AS total_team_members
+        """).fetchone()
+        conn.executemany("INSERT OR REPLACE INTO platform_stats(name, value) VALUES (?, ?)",
+                         [(field, counts[field]) for field in STAT_FIELDS])
+
+    def connection(self) -> sqlite3.Connection:
+        """One connection per thread"""
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.db_path, timeout=30)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            conn.execute("PRAGMA foreign_keys=ON")
+            self._local.conn = conn
+        return conn
+
+    def signature(self, doc: str) -> Optional[tuple]:
+        row = self.connection().execute("SELECT version FROM doc_versions WHERE name = ?", (doc,)).fetchone()
+        return None if row is None else (row["version"],)
+
+    def load(self, doc: str) -> Dict:
+        conn = self.connection()
+        if doc == USERS_DOC:
+            return {row["username"]: _join(row, USER_COLUMNS)
+                    for row in conn.execute("SELECT * FROM users ORDER BY rowid")}
+        if doc == TECH_LEADS_DOC:
+            return {row["username"]: _join(row, TECH_LEAD_COLUMNS)
+                    for row in conn.execute("SELECT * FROM tech_leads ORDER BY rowid")}
+        if doc == TEAMS_DOC:
+            # Both queries read the same snapshot
+            in_transaction = conn.in_transaction
+            if not in_transaction:
+                conn.execute("BEGIN")
+            try:
+                teams = {}
+                for row in conn.execute("SELECT * FROM teams ORDER BY rowid"):
+                    team = _join(row, TEAM_COLUMNS)
+                    team['members'] = []
+                    teams[row["team_id"]] = team
+                for row in conn.execute("SELECT * FROM team_members ORDER BY member_id"):
+                    if row["team_id"] in teams:
+                        teams[row["team_id"]]['members'].append(_join(row, MEMBER_COLUMNS))
+            finally:
+                if not in_transaction:
+                    conn.commit()
+            return teams
+        row = conn.execute("SELECT body FROM documents WHERE name = ?", (doc,)).fetchone()
+        return json.loads(row["body"]) if row else {}
+
+    def save(self, doc: str, data: Dict) -> None:
+        """Replace a whole document in one transaction"""
+        conn = self.connection()
+        with conn:
+            self._save(conn, doc, data)
+
+    def update(self, doc: str, mutate: Callable[[Dict], Any]) -> Any:
+        """Read-modify-write a document inside one write transaction"""
+        conn = self.connection()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            data = self.load(doc)
+            result = mutate(data)
+            self._save(conn, doc, data)
+        return result
+
+    def _save(self, conn: sqlite3.Connection, doc: str, data: Dict) -> None:
+        if doc == USERS_DOC:
+            conn.execute("DELETE FROM users")
+            conn.executemany("INSERT INTO users VALUES (?, ?, ?, ?)",
+                             [(username,) + _split(user, USER_COLUMNS) for username, user in data.items()])
+        elif doc == TECH_LEADS_DOC:
+            conn.execute("DELETE FROM tech_leads")
+            conn.executemany("INSERT INTO tech_leads VALUES (?, ?, ?, ?, ?, ?)",
+                             [(username,) + _split(lead, TECH_LEAD_COLUMNS) for username, lead in data.items()])
+        elif doc == TEAMS_DOC:
+            conn.execute("DELETE FROM team_members")
+            conn.execute("DELETE FROM teams")
+            for team_id, team in data.items():
+                team = dict(team)
+                members = team.pop('members', [])
+                conn.execute("INSERT INTO teams VALUES (?, ?, ?, ?)", (team_id,) + _split(team, TEAM_COLUMNS))
+                self._insert_members(conn, team_id, members)
+        else:
+            conn.execute("INSERT INTO documents(name, body) VALUES (?, ?) "
+                         "ON CONFLICT(name) DO UPDATE SET body = excluded.body", (doc, json.dumps(data)))
+
+    def _insert_members(self, conn: sqlite3.Connection, team_id: str, members: List[Dict]) -> None:
+        conn.executemany(
+            "INSERT INTO team_members(team_id, name, gitlab_username, added_at, extra) VALUES (?, ?, ?, ?, ?)",
+            [(team_id,) + _split(member, MEMBER_COLUMNS) for member in members]
+        )
+
+    def set_user_role(self, username: str, role: str, registered_at: str) -> None:
+        with self.connection() as conn:
+            conn.execute(
+                "INSERT INTO users(username, role, registered_at) VALUES (?, ?, ?) "
+                "ON CONFLICT(username) DO UPDATE SET role = excluded.role, registered_at = excluded.registered_at",
+                (username, role, registered_at)
+            )
+
+    def register_tech_lead(self, username: str, record: Dict) -> None:
+        with self.connection() as conn:
+            # An upsert rather than INSERT OR REPLACE: REPLACE deletes the old
+            # row without firing the delete triggers that keep the counts
+            conn.execute(
+                "INSERT INTO tech_leads VALUES (?, ?, ?, ?, ?, ?) ON CONFLICT(username) DO UPDATE SET "
+                "token_hash = excluded.token_hash, registered_at = excluded.registered_at, "
+                "status = excluded.status, permissions = excluded.permissions, extra = excluded.extra",
+                (username,) + _split(record, TECH_LEAD_COLUMNS)
+            )
+
+    def ensure_team(self, team_id: str, leader: str, created_at: str) -> Dict:
+        conn = self.connection()
+        with conn:
+            conn.execute("INSERT OR IGNORE INTO teams(team_id, leader, created_at) VALUES (?, ?, ?)",
+                         (team_id, leader, created_at))
+        row = conn.execute("SELECT * FROM teams WHERE team_id = ?", (team_id,)).fetchone()
+        team = _join(row, TEAM_COLUMNS)
+        team['members'] = [_join(member, MEMBER_COLUMNS) for member in conn.execute(
+            "SELECT * FROM team_members WHERE team_id = ? ORDER BY member_id", (team_id,))]
+        return team
+
+    def add_member(self, team_id: str, member: Dict) -> None:
+        conn = self.connection()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            members = [_join(row, MEMBER_COLUMNS) for row in conn.execute(
+                "SELECT * FROM team_members WHERE team_id = ?", (team_id,))]
+            check_member_add(members, member)
+            self._insert_members(conn, team_id, [member])
+
+    def remove_member(self, team_id: str, gitlab_username: str) -> None:
+        with self.connection() as conn:
+            conn.execute("DELETE FROM team_members WHERE team_id = ? AND lower(gitlab_username) = ?",
+                         (team_id, gitlab_username.lower()))
+
+    def apply_member_changes(self, changes: List[Dict], created_at: str) -> Dict:
+        """Validate and commit a member batch in one transaction, or raise MemberBatchError"""
+        conn = self.connection()
+        with conn:
+            conn.execute("BEGIN IMMEDIATE")
+            plan = plan_member_changes(self.load(TEAMS_DOC), changes, created_at)
+            if plan['errors']:
+                raise MemberBatchError(plan['errors'])
+            conn.executemany("INSERT INTO teams(team_id, leader, created_at) VALUES (?, ?, ?)",
+                             [(team_id, leader, created_at) for team_id, leader in plan['created']])
+            for operation in plan['operations']:
+                if operation[0] == 'add':
+                    self._insert_members(conn, operation[1], [operation[2]])
+                elif operation[0] == 'remove':
+                    conn.execute("DELETE FROM team_members WHERE team_id = ? AND gitlab_username = ?",
+                                 operation[1:])
+                else:
+                    _, source, target, gitlab_username = operation
+                    conn.execute("UPDATE team_members SET team_id = ? WHERE team_id = ? AND gitlab_username = ?",
+                                 (target, source, gitlab_username))
+        return plan
+
+    def has_user(self, username: str) -> bool:
+        row = self.connection().execute("SELECT 1 FROM users WHERE username = ?", (username,)).fetchone()
+        return row is not None
+
+    def users_by_role(self, role: Optional[str]) -> List[str]:
+        rows = self.connection().execute("SELECT username FROM users WHERE role IS ? ORDER BY rowid", (role,))
+        return [row["username"] for row in rows]
+
+    def teams_by_leader(self, leader: str) -> List[str]:
+        rows = self.connection().execute("SELECT team_id FROM teams WHERE leader = ? ORDER BY rowid", (leader,))
+        return [row["team_id"] for row in rows]
+
+    def iter_teams(self, leader: str = None, min_members: int = None, max_members: int = None,
+                   created_since: str = None, created_before: str = None, sort: str = "created_at",
+                   descending: bool = False, after: tuple = None) -> Iterator[Dict]:
+        """Team summaries matching the filters, in sort order, after the `after` key.
+
+        Rows are stepped from the query as they are consumed; sorting by
+        creation date (or by leader, for one leader) walks an index.
+        """
+        if sort not in TEAM_SORTS:
+            raise ValueError(f"Unknown sort: {sort}")
+        sort_column = {"created_at": "COALESCE(created_at, '')", "leader": "COALESCE(leader, '')",
+                       "member_count": "member_count", "team_id": "team_id"}[sort]
+        inner, outer, params, outer_params = [], [], [], []
+        if leader is not None:
+            inner.append("leader = ?")
+            params.append(leader)
+        if created_since is not None:
+            inner.append("COALESCE(created_at, '') >= ?")
+            params.append(created_since)
+        if created_before is not None:
+            inner.append("COALESCE(created_at, '') < ?")
+            params.append(created_before)
+        if min_members is not None:
+            outer.append("member_count >= ?")
+            outer_params.append(min_members)
+        if max_members is not None:
+            outer.append("member_count <= ?")
+            outer_params.append(max_members)
+        if after is not None:
+            outer.append(f"({sort_column}, team_id) {'<' if descending else '>'} (?, ?)")
+            outer_params.extend(after)
+        direction = "DESC" if descending else "ASC"
+        sql = (
+            "SELECT * FROM (SELECT team_id, leader, created_at, "
+            "(SELECT COUNT(*) FROM team_members m WHERE m.team_id = t.team_id) AS member_count "
+            f"FROM teams t{' WHERE ' + ' AND '.join(inner) if inner else ''})"
+            f"{' WHERE ' + ' AND '.join(outer) if outer else ''} "
+            f"ORDER BY {sort_column} {direction}, team_id {direction}"
+        )
+        cursor = self.connection().execute(sql, params + outer_params)
+        try:
+            for row in cursor:
+                yield {'team_id': row["team_id"], 'leader': row["leader"], 'created_at': row["created_at"],
+                       'member_count': row["member_count"]}
+        finally:
+            cursor.close()
+
+    def team_members(self, team_id: str) -> List[Dict]:
+        return [_join(row, MEMBER_COLUMNS) for row in self.connection().execute(
+            "SELECT * FROM team_members WHERE team_id = ? ORDER BY member_id", (team_id,))]
+
+    def find_member(self, gitlab_username: str) -> Optional[Tuple[str, Dict]]:
+        row = self.connection().execute(
+            "SELECT * FROM team_members WHERE lower(gitlab_username) = lower(?) ORDER BY member_id LIMIT 1",
+            (gitlab_username,)
+        ).fetchone()
+        return None if row is None else (row["team_id"], _join(row, MEMBER_COLUMNS))
+
+
+def get_storage(backend: str = None):
+    """Storage backend selected by TECHDEV_STORAGE"""
+    backend = backend or os.environ.get("TECHDEV_STORAGE", "json")
+    if backend == "sqlite":
+        return SqliteStorage(os.environ.get("TECHDEV_DB", "techdev.db"))
+    if backend == "json":
+        return JsonStorage(os.environ.get("TECHDEV_DATA_DIR", "."))
+    raise ValueError(f"Unknown storage backend: {backend}")
+
+
+def migrate_json_to_sqlite(json_dir: str, db_path: str, extra_docs: List[str] = ()) -> Dict[str, int]:
+    """Copy the JSON documents into a SQLite database, replacing its contents"""
+    source = JsonStorage(json_dir)
+    target = SqliteStorage(db_path)
+    counts = {}
+    for doc in (USERS_DOC, TEAMS_DOC, TECH_LEADS_DOC, *extra_docs):
+        data = source.load(doc)
+        target.save(doc, data)
+        counts[doc] = len(data)
+    return counts
+
+
+def verify_stats(storage) -> Dict[str, Tuple[int, int]]:
+    """Fields whose maintained count differs from a full scan: {field: (stored, actual)}"""
+    stored = storage.platform_stats()
+    actual = {}
+    for doc in DOC_STAT_FIELDS:
+        actual.update(compute_doc_stats(doc, storage.load(doc)))
+    return {field: (stored.get(field), actual[field]) for field in STAT_FIELDS
+            if stored.get(field) != actual[field]}
+
+
+def _stress_worker(backend: str, location: str, worker: int, ops: int, team_id: str) -> int:
+    storage = JsonStorage(location) if backend == "json" else SqliteStorage(location)
+    for op in range(ops):
+        storage.set_user_role(f"user{worker}_{op}@example.com", "Developer Intern", "2025-01-01T00:00:00")
+        storage.add_member(f"{team_id}{worker}_{op // MAX_TEAM_SIZE}", {
+            'name': f"member {worker}-{op}",
+            'gitlab_username': f"gl{worker}_{op}",
+            'added_at': "2025-01-01T00:00:00",
+        })
+    return storage.conflicts
+
+
+def stress_test(backend: str = "json", workers: int = 8, ops: int = 50, processes: bool = False) -> Dict:
+    """Hammer set_user_role and add_member from many writers at once.
+
+    Every worker writes its own users and members into shared documents, so
+    any lost update shows up as a missing record. Runs in a temporary
+    directory and returns counts and timings.
+    """
+    import tempfile
+    from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor
+
+    team_id = "stress_team_"
+    with tempfile.TemporaryDirectory() as directory:
+        location = directory if backend == "json" else os.path.join(directory, "stress.db")
+        storage = JsonStorage(location) if backend == "json" else SqliteStorage(location)
+        for worker in range(workers):
+            for slot in range(-(-ops // MAX_TEAM_SIZE)):
+                storage.ensure_team(f"{team_id}{worker}_{slot}", f"leader{worker}", "2025-01-01T00:00:00")
+
+        pool_class = ProcessPoolExecutor if processes else ThreadPoolExecutor
+        started = time.perf_counter()
+        with pool_class(max_workers=workers) as pool:
+            futures = [pool.submit(_stress_worker, backend, location, worker, ops, team_id)
+                       for worker in range(workers)]
+            conflicts = sum(future.result() for future in futures)
+        elapsed = time.perf_counter() - started
+
+        users = storage.load(USERS_DOC)
+        teams = storage.load(TEAMS_DOC)
+        drift = verify_stats(storage)
+        members = sum(len(team['members']) for team in teams.values())
+        expected = workers * ops
+        return {
+            'backend': backend,
+            'writers': f"{workers} {'processes' if processes else 'threads'}",
+            'expected_users': expected,
+            'users': len(users),
+            'expected_members': expected,
+            'members': members,
+            'conflicts_retried': conflicts,
+            'seconds': round(elapsed, 3),
+            'writes_per_second': round(2 * expected / elapsed, 1),
+            'stats_drift': drift,
+            'ok': len(users) == expected and members == expected and not drift,
+        }
+
+
+def main(argv: List[str] = None) -> None:
+    parser = argparse.ArgumentParser(description="TechDev storage tools")
+    commands = parser.add_subparsers(dest="command", required=True)
+    migrate = commands.add_parser("migrate", help="import the JSON data files into SQLite")
+    migrate.add_argument("--json-dir", default=".")
+    migrate.add_argument("--db", default="techdev.db")
+    migrate.add_argument("--doc", action="append", default=None,
+                         help="additional JSON document to copy (repeatable; default: users.json)")
+    stats = commands.add_parser("stats", help="check the maintained platform stats against a full rebuild")
+    stats.add_argument("--backend", choices=["json", "sqlite"], default=None)
+    stats.add_argument("--rebuild", action="store_true", help="overwrite the stored stats with the rebuilt ones")
+    stress = commands.add_parser("stress", help="concurrent writers must not lose updates")
+    stress.add_argument("--backend", choices=["json", "sqlite"], default="json")
+    stress.add_argument("--workers", type=int, default=8)
+    stress.add_argument("--ops", type=int, default=50, help="role updates and member adds per worker")
+    stress.add_argument("--processes", action="store_true", help="use processes instead of threads")
+    args = parser.parse_args(argv)
+
+    if args.command == "migrate":
+        extra_docs = args.doc if args.doc is not None else ["users.json"]
+        counts = migrate_json_to_sqlite(args.json_dir, args.db, extra_docs)
+        for doc, count in counts.items():
+            print(f"{doc}: {count} records")
+    elif args.command == "stats":
+        storage = get_storage(args.backend)
+        drift = verify_stats(storage)
+        if not drift:
+            print("Platform stats match a full rebuild")
+        for field, (stored, actual) in drift.items():
+            print(f"{field}: stored {stored}, actual {actual}")
+        if drift and args.rebuild:
+            storage.rebuild_stats()
+            print("Stored stats rebuilt")
+        elif drift:
+            raise SystemExit("Platform stats have drifted; rerun with --rebuild to fix")
+    elif args.command == "stress":
+        result = stress_test(args.backend, args.workers, args.ops, args.processes)
+        print(json.dumps(result, indent=2))
+        if not result['ok']:
+            raise SystemExit("Lost updates detected")
+
+
+if __name__ == "__main__":
+    main()